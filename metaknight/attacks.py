@@ -0,0 +1,153 @@
+"""
+Attack tables, computed once when this module is imported.
+Every table is indexed by the index of a square (see Square.index): a1 is 0, h8 is 63
+"""
+from typing import Dict, List, Optional, Tuple
+
+
+def _targets(deltas: List[Tuple[int, int]]) -> List[Tuple[int, ...]]:
+    """
+    :param deltas: (rank, file) offsets that a piece can jump to
+    :return: for each square, the indices of the squares reached by deltas that are on the board, in the order of deltas
+    """
+    table = []
+    for index in range(64):
+        rank, file = divmod(index, 8)
+        targets = []
+        for rank_delta, file_delta in deltas:
+            if 0 <= rank + rank_delta < 8 and 0 <= file + file_delta < 8:
+                targets.append(8 * (rank + rank_delta) + file + file_delta)
+        table.append(tuple(targets))
+    return table
+
+
+def _to_bitboards(table: List[Tuple[int, ...]]) -> List[int]:
+    bitboards = []
+    for targets in table:
+        bitboard = 0
+        for target in targets:
+            bitboard |= 1 << target
+        bitboards.append(bitboard)
+    return bitboards
+
+
+# Target squares listed in the order that Board.get_moves returns them
+KNIGHT_TARGETS = _targets([(2, -1), (2, 1), (-2, -1), (-2, 1), (1, -2), (-1, -2), (1, 2), (-1, 2)])
+KING_TARGETS = _targets([(1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1)])
+
+# PAWN_CAPTURE_TARGETS[color.value][index] are the squares a pawn of that color on index attacks, left one first
+PAWN_CAPTURE_TARGETS = [_targets([(1, -1), (1, 1)]), _targets([(-1, -1), (-1, 1)])]
+
+KNIGHT_ATTACKS = _to_bitboards(KNIGHT_TARGETS)
+KING_ATTACKS = _to_bitboards(KING_TARGETS)
+PAWN_ATTACKS = [_to_bitboards(PAWN_CAPTURE_TARGETS[0]), _to_bitboards(PAWN_CAPTURE_TARGETS[1])]
+
+
+# Sliding pieces
+# A ray is the tuple of squares a slider passes through in one direction, ordered from the nearest square outwards.
+# Rays are listed in the order that Board.get_moves returns them
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, -1), (0, 1)]
+BISHOP_DIRECTIONS = [(1, -1), (1, 1), (-1, -1), (-1, 1)]
+
+
+def _rays(directions: List[Tuple[int, int]]) -> List[List[Tuple[int, ...]]]:
+    table = []
+    for index in range(64):
+        rays = []
+        for rank_delta, file_delta in directions:
+            rank, file = divmod(index, 8)
+            ray = []
+            while 0 <= rank + rank_delta < 8 and 0 <= file + file_delta < 8:
+                rank += rank_delta
+                file += file_delta
+                ray.append(8 * rank + file)
+            rays.append(tuple(ray))
+        table.append(rays)
+    return table
+
+
+def _relevant_occupancy(rays: List[Tuple[int, ...]]) -> int:
+    """
+    :return: the squares whose occupancy changes the attacks along rays. The last square of a ray never blocks anything
+    """
+    mask = 0
+    for ray in rays:
+        for target in ray[:-1]:
+            mask |= 1 << target
+    return mask
+
+
+ROOK_RAYS = _rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = _rays(BISHOP_DIRECTIONS)
+ROOK_MASKS = [_relevant_occupancy(rays) for rays in ROOK_RAYS]
+BISHOP_MASKS = [_relevant_occupancy(rays) for rays in BISHOP_RAYS]
+
+
+def _sliding_table(rays: List[Tuple[int, ...]], mask: int) -> Dict[int, int]:
+    """
+    :return: the attacks along rays for every subset of the squares in mask, keyed by that subset
+    """
+    table = {}
+    blockers = 0
+    while True:
+        attacks = 0
+        for ray in rays:
+            for target in ray:
+                attacks |= 1 << target
+                if blockers & (1 << target):
+                    break
+        table[blockers] = attacks
+        blockers = (blockers - mask) & mask  # next subset of mask
+        if not blockers:
+            return table
+
+
+# These play the role of magic bitboard tables: the attacks of a slider are found with a single lookup keyed by the
+# occupancy of its relevant squares. Python's dict does the hashing that a magic multiplication does in C.
+# Each square's table is built the first time a slider on that square is looked up
+_rook_tables: List[Optional[Dict[int, int]]] = [None] * 64
+_bishop_tables: List[Optional[Dict[int, int]]] = [None] * 64
+
+
+def rook_attacks(index: int, occupied: int) -> int:
+    """
+    :param index: the square the rook stands on
+    :param occupied: bitboard of every occupied square
+    :return: bitboard of the squares the rook attacks, including the first blocker of each ray whatever its color
+    """
+    table = _rook_tables[index]
+    if table is None:
+        table = _rook_tables[index] = _sliding_table(ROOK_RAYS[index], ROOK_MASKS[index])
+    return table[occupied & ROOK_MASKS[index]]
+
+
+def bishop_attacks(index: int, occupied: int) -> int:
+    """
+    :param index: the square the bishop stands on
+    :param occupied: bitboard of every occupied square
+    :return: bitboard of the squares the bishop attacks, including the first blocker of each ray whatever its color
+    """
+    table = _bishop_tables[index]
+    if table is None:
+        table = _bishop_tables[index] = _sliding_table(BISHOP_RAYS[index], BISHOP_MASKS[index])
+    return table[occupied & BISHOP_MASKS[index]]
+
+
+def queen_attacks(index: int, occupied: int) -> int:
+    return rook_attacks(index, occupied) | bishop_attacks(index, occupied)
+
+
+def _between() -> List[List[int]]:
+    table = [[0] * 64 for _ in range(64)]
+    for index in range(64):
+        for ray in ROOK_RAYS[index] + BISHOP_RAYS[index]:
+            passed = 0
+            for target in ray:
+                table[index][target] = passed
+                passed |= 1 << target
+    return table
+
+
+# BETWEEN[a][b] is the bitboard of the squares strictly between a and b, if they share a rank, file or diagonal.
+# It is 0 if a and b are not aligned, or if they are neighbours
+BETWEEN = _between()
@@ -0,0 +1,39 @@
+"""
+Helpers for working with bitboards: 64 bit integers where bit i is set if square i is occupied.
+Square indices go a1 = 0, b1 = 1, ..., h1 = 7, a2 = 8, ..., h8 = 63
+"""
+from typing import Iterator
+
+DARK_SQUARES = 0xAA55AA55AA55AA55  # a1, c1, ..., b2, d2, ...
+
+
+def bit(index: int) -> int:
+    """
+    :param index: the index of a square
+    :return: a bitboard with only that square set
+    """
+    return 1 << index
+
+
+def lsb(bitboard: int) -> int:
+    """
+    :return: the index of the least significant set square of bitboard, -1 if bitboard is empty
+    """
+    return (bitboard & -bitboard).bit_length() - 1
+
+
+def iter_bits(bitboard: int) -> Iterator[int]:
+    """
+    Yields the index of every set square of bitboard, from a1 towards h8
+    """
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+def popcount(bitboard: int) -> int:
+    """
+    :return: the number of squares set in bitboard
+    """
+    return bin(bitboard).count('1')
@@ -1,16 +1,61 @@
 from metaknight.piece import PieceType, Piece, Color
-from metaknight.square import Square
+from metaknight.square import Square, INDICES, OFF_BOARD
+from metaknight.bitboard import bit
+from metaknight.zobrist import PIECE_KEYS
+from metaknight.evaluation import MIDDLEGAME_TABLES, ENDGAME_TABLES, PHASE_WEIGHTS, tapered
+from metaknight.attacks import KNIGHT_TARGETS, KING_TARGETS, PAWN_CAPTURE_TARGETS, KNIGHT_ATTACKS, KING_ATTACKS, \
+    PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS, rook_attacks, bishop_attacks, queen_attacks
 from typing import List
 
 
+def bitboard_index(piece_type: PieceType, color: Color) -> int:
+    """
+    :return: the position of the bitboard for pieces of piece_type and color in Board.bitboards
+    """
+    return 6 * color.value + piece_type.value
+
+
+# The letters of Board.set_board_state: lowercase for white, uppercase for black, and '.' for an empty square
+_STATE_PIECES = {'.': None}
+_STATE_PIECES.update((letter, Piece(piece_type, color)) for color, letters in ((Color.WHITE, 'pnbrqk'),
+                                                                              (Color.BLACK, 'PNBRQK'))
+                     for piece_type, letter in zip(PieceType, letters))
+
+
 class Board:
-    def __init__(self):
-        self.squares: List[List[Square]] = [[Square(file + rank) for file in Square.files] for rank in Square.ranks]
-        self.set_up()
+    # The value of each piece type in pawns, indexed by PieceType.value
+    piece_values = [1, 3, 3, 5, 9, 0]
+
+    def __init__(self, set_up: bool=True):
+        """
+        :param set_up: False to start with an empty board rather than the starting position
+        """
+        self.squares: List[List[Square]] = []
+        self.clear()
+        if set_up:
+            self.set_up()
 
     def __repr__(self):
         return self.board_as_str(Color.WHITE)
 
+    def copy(self) -> 'Board':
+        """
+        :return: a board with the same pieces, whose squares are its own. The bitboards, keys and scores are copied
+        rather than recomputed, so this costs the same whatever the position
+        """
+        board = Board(set_up=False)
+        for square, original in zip(board._squares, self._squares):
+            square.piece = original.piece
+        board.bitboards = self.bitboards.copy()
+        board.occupancy = self.occupancy.copy()
+        board.king_squares = self.king_squares.copy()
+        board.zobrist_key = self.zobrist_key
+        board.material = self.material
+        board.middlegame_score = self.middlegame_score
+        board.endgame_score = self.endgame_score
+        board.phase = self.phase
+        return board
+
     def board_as_str(self, perspective: Color):
         """
         Prints the current state of the board
@@ -41,7 +86,60 @@ class Board:
     def clear(self):
         """ This method will only be used for debugging purposes
         """
-        self.squares = [[Square(file + rank) for file in Square.files] for rank in Square.ranks]
+        self.squares = [[Square.unique(file + rank) for file in Square.files] for rank in Square.ranks]
+        self._squares: List[Square] = [square for row in self.squares for square in row]  # indexed by Square.index
+
+        # The position is stored in bitboards, see metaknight.bitboard
+        # bitboards holds one bitboard per piece type and color, indexed by bitboard_index
+        # occupancy holds every square occupied by white at index 0, and by black at index 1
+        self.bitboards: List[int] = [0] * 12
+        self.occupancy: List[int] = [0, 0]
+        self.king_squares: List[int] = [-1, -1]  # index of each color's king, -1 if it has none
+
+        # The Zobrist key of the pieces on the board, see metaknight.zobrist
+        self.zobrist_key: int = 0
+
+        # Running totals for evaluate, kept up to date by set_piece. The scores are white's minus black's
+        self.material: int = 0  # in pawns, see piece_values
+        self.middlegame_score: int = 0  # in centipawns, see metaknight.evaluation
+        self.endgame_score: int = 0
+        self.phase: int = 0
+
+    def set_piece(self, piece: Piece, location=None, square=None):
+        """
+        Puts piece on a square, replacing whatever was there. Every change to the position must go through this method,
+        so that the bitboards stay in sync with self.squares
+        :param piece: the piece to put on the square, None to empty the square
+        :param location: string coordinates of a square. For example: 'a3' or 'c8'
+        :param square: a square object that is not located in this board
+        """
+        square = self.get_square(location=location, square=square)
+        index = square.index
+        mask = bit(index)
+        old = square.piece
+        if old:
+            kind = bitboard_index(old.piece_type, old.color)
+            self.bitboards[kind] ^= mask
+            self.zobrist_key ^= PIECE_KEYS[kind][index]
+            self.occupancy[old.color.value] ^= mask
+            self.material -= _MATERIAL[kind]
+            self.middlegame_score -= MIDDLEGAME_TABLES[kind][index]
+            self.endgame_score -= ENDGAME_TABLES[kind][index]
+            self.phase -= PHASE_WEIGHTS[old.piece_type.value]
+            if old.piece_type is PieceType.KING and self.king_squares[old.color.value] == index:
+                self.king_squares[old.color.value] = -1
+        if piece:
+            kind = bitboard_index(piece.piece_type, piece.color)
+            self.bitboards[kind] |= mask
+            self.zobrist_key ^= PIECE_KEYS[kind][index]
+            self.occupancy[piece.color.value] |= mask
+            self.material += _MATERIAL[kind]
+            self.middlegame_score += MIDDLEGAME_TABLES[kind][index]
+            self.endgame_score += ENDGAME_TABLES[kind][index]
+            self.phase += PHASE_WEIGHTS[piece.piece_type.value]
+            if piece.piece_type is PieceType.KING:
+                self.king_squares[piece.color.value] = index
+        square.piece = piece
 
     def set_board_state(self, board_state: List[str]):
         """
@@ -51,61 +149,36 @@ class Board:
         self.clear()
         for i in range(0, 8):
             for j in range(0, 8):
-                piece = board_state[i][j]
-                if piece == '.':
-                    piece = None
-                elif piece == 'p':
-                    piece = Piece(PieceType.PAWN, Color.WHITE)
-                elif piece == 'n':
-                    piece = Piece(PieceType.KNIGHT, Color.WHITE)
-                elif piece == 'b':
-                    piece = Piece(PieceType.BISHOP, Color.WHITE)
-                elif piece == 'r':
-                    piece = Piece(PieceType.ROOK, Color.WHITE)
-                elif piece == 'q':
-                    piece = Piece(PieceType.QUEEN, Color.WHITE)
-                elif piece == 'k':
-                    piece = Piece(PieceType.KING, Color.WHITE)
-                elif piece == 'P':
-                    piece = Piece(PieceType.PAWN, Color.BLACK)
-                elif piece == 'N':
-                    piece = Piece(PieceType.KNIGHT, Color.BLACK)
-                elif piece == 'B':
-                    piece = Piece(PieceType.BISHOP, Color.BLACK)
-                elif piece == 'R':
-                    piece = Piece(PieceType.ROOK, Color.BLACK)
-                elif piece == 'Q':
-                    piece = Piece(PieceType.QUEEN, Color.BLACK)
-                elif piece == 'K':
-                    piece = Piece(PieceType.KING, Color.BLACK)
-                self.squares[7-i][j].piece = piece
+                piece = _STATE_PIECES[board_state[i][j]]
+                if piece:
+                    self.set_piece(piece, square=self.squares[7-i][j])
 
     def set_up(self):
         # Pawns
         for i in range(8):
-            self.squares[1][i].piece = Piece(PieceType.PAWN, Color.WHITE)
-            self.squares[6][i].piece = Piece(PieceType.PAWN, Color.BLACK)
+            self.set_piece(Piece(PieceType.PAWN, Color.WHITE), square=self.squares[1][i])
+            self.set_piece(Piece(PieceType.PAWN, Color.BLACK), square=self.squares[6][i])
 
         # Rooks
         for i in (0, 7):
-            self.squares[0][i].piece = Piece(PieceType.ROOK, Color.WHITE)
-            self.squares[7][i].piece = Piece(PieceType.ROOK, Color.BLACK)
+            self.set_piece(Piece(PieceType.ROOK, Color.WHITE), square=self.squares[0][i])
+            self.set_piece(Piece(PieceType.ROOK, Color.BLACK), square=self.squares[7][i])
 
         # Knights
         for i in (1, 6):
-            self.squares[0][i].piece = Piece(PieceType.KNIGHT, Color.WHITE)
-            self.squares[7][i].piece = Piece(PieceType.KNIGHT, Color.BLACK)
+            self.set_piece(Piece(PieceType.KNIGHT, Color.WHITE), square=self.squares[0][i])
+            self.set_piece(Piece(PieceType.KNIGHT, Color.BLACK), square=self.squares[7][i])
 
         # Bishops
         for i in (2, 5):
-            self.squares[0][i].piece = Piece(PieceType.BISHOP, Color.WHITE)
-            self.squares[7][i].piece = Piece(PieceType.BISHOP, Color.BLACK)
+            self.set_piece(Piece(PieceType.BISHOP, Color.WHITE), square=self.squares[0][i])
+            self.set_piece(Piece(PieceType.BISHOP, Color.BLACK), square=self.squares[7][i])
 
         # Kings and queens
-        self.squares[0][3].piece = Piece(PieceType.QUEEN, Color.WHITE)
-        self.squares[0][4].piece = Piece(PieceType.KING, Color.WHITE)
-        self.squares[7][3].piece = Piece(PieceType.QUEEN, Color.BLACK)
-        self.squares[7][4].piece = Piece(PieceType.KING, Color.BLACK)
+        self.set_piece(Piece(PieceType.QUEEN, Color.WHITE), square=self.squares[0][3])
+        self.set_piece(Piece(PieceType.KING, Color.WHITE), square=self.squares[0][4])
+        self.set_piece(Piece(PieceType.QUEEN, Color.BLACK), square=self.squares[7][3])
+        self.set_piece(Piece(PieceType.KING, Color.BLACK), square=self.squares[7][4])
 
     def get_square(self, location=None, square=None) -> Square:
         """
@@ -113,18 +186,19 @@ class Board:
         :param square: a square object that is not located in this board
         :return: the square at location in this board
         """
-        if location == '00' or square == Square('00'):
-            return Square('00')
-
         if location:
-            file = Square.files.index(location[0])
-            rank = Square.ranks.index(location[1])
+            if location == '00':
+                return OFF_BOARD
+            index = INDICES.get(location)
+            if index is None:
+                raise ValueError(f'{location} is not a square on the board')
         elif square:
-            file = Square.files.index(square.file)
-            rank = Square.ranks.index(square.rank)
+            index = square.index
         else:
             raise ValueError('Must enter either a string location, or a Square object')
-        return self.squares[rank][file]
+        if index < 0:
+            return OFF_BOARD
+        return self._squares[index]
 
     def get_moves(self, location=None, square=None) -> List[List[Square]]:
         square = self.get_square(location=location, square=square)
@@ -145,113 +219,122 @@ class Board:
         moves = []
         square = self.get_square(square=square)
         color = square.piece.color
-        forward = Square.up
+        forward = 8
         rank = '2'
         if square.piece.color is Color.BLACK:
-            forward = Square.down
+            forward = -8
             rank = '7'
 
-        forward_square = self.get_square(square=forward(square))
-        if forward_square.piece is None:
-            moves.append([forward_square])
-            forward_square = self.get_square(square=forward(forward_square))
-            if square.rank == rank and forward_square.piece is None:
-                moves[0].append(forward_square)
-        if square.file != 'a':
-            diagonal = self.get_square(square=forward(square).left())
-            if diagonal.piece and diagonal.piece.color is not color:
-                moves.append([diagonal])
-        if square.file != 'h':
-            diagonal = self.get_square(square=forward(square).right())
-            if diagonal.piece and diagonal.piece.color is not color:
-                moves.append([diagonal])
+        occupied = self.occupancy[0] | self.occupancy[1]
+        enemies = self.occupancy[color.switch().value]
+        target = square.index + forward
+        if 0 <= target < 64 and not occupied & bit(target):
+            moves.append([self._squares[target]])
+            target += forward
+            if square.rank == rank and not occupied & bit(target):
+                moves[0].append(self._squares[target])
+        for target in PAWN_CAPTURE_TARGETS[color.value][square.index]:
+            if enemies & bit(target):
+                moves.append([self._squares[target]])
         return moves
 
     def _knight_moves(self, square: Square) -> List[List[Square]]:
         original = self.get_square(square=square)
-        color = original.piece.color
-        moves = [
-            self.get_square(square=original.up().up().left()),
-            self.get_square(square=original.up().up().right()),
-            self.get_square(square=original.down().down().left()),
-            self.get_square(square=original.down().down().right()),
-            self.get_square(square=original.left().left().up()),
-            self.get_square(square=original.left().left().down()),
-            self.get_square(square=original.right().right().up()),
-            self.get_square(square=original.right().right().down())
-        ]
-        possible_moves = []
-        for move in moves:
-            if move != Square('00') and (not move.piece or move.piece.color is not color):
-                possible_moves.append([move])
-        return possible_moves
+        friends = self.occupancy[original.piece.color.value]
+        return [[self._squares[target]] for target in KNIGHT_TARGETS[original.index] if not friends & bit(target)]
 
-    def _bishop_moves(self, square: Square) -> List[List[Square]]:
+    def _sliding_moves(self, original: Square, attacks: int, rays) -> List[List[Square]]:
+        """
+        :param attacks: bitboard of the squares attacked by the slider on original
+        :param rays: the rays leaving original, see metaknight.attacks
+        :return: the squares of each ray that the slider can move to, grouped by ray
+        """
+        attacks &= ~self.occupancy[original.piece.color.value]
         moves = []
-        original = self.get_square(square=square)
-        color = original.piece.color
-        for func1 in (Square.up, Square.down):
-            for func2 in (Square.left, Square.right):
-                diagonal = []
-                square = original
-                while True:
-                    square = self.get_square(square=func2(func1(square)))
-                    if square == Square('00'):
-                        break
-                    if not square.piece and square != Square('00'):
-                        diagonal.append(square)
-                    elif square.piece.color is not color:
-                        diagonal.append(square)
-                        break
-                    else:
-                        break
-                if len(diagonal) >= 1:
-                    moves.append(diagonal.copy())
+        for ray in rays:
+            line = []
+            for target in ray:
+                if not attacks & bit(target):
+                    break
+                line.append(self._squares[target])
+            if line:
+                moves.append(line)
         return moves
 
+    def _bishop_moves(self, square: Square) -> List[List[Square]]:
+        original = self.get_square(square=square)
+        attacks = bishop_attacks(original.index, self.occupancy[0] | self.occupancy[1])
+        return self._sliding_moves(original, attacks, BISHOP_RAYS[original.index])
+
     def _rook_moves(self, square: Square) -> List[List[Square]]:
-        moves = []
         original = self.get_square(square=square)
-        color = original.piece.color
-        for func in (Square.up, Square.down, Square.left, Square.right):
-            line = []
-            square = original
-            while True:
-                square = self.get_square(square=func(square))
-                if square == Square('00'):
-                    break
-                if not square.piece and square != Square('00'):
-                    line.append(square)
-                elif square.piece.color is not color:
-                    line.append(square)
-                    break
-                else:
-                    break
-            if len(line) >= 1:
-                moves.append(line.copy())
-        return moves
+        attacks = rook_attacks(original.index, self.occupancy[0] | self.occupancy[1])
+        return self._sliding_moves(original, attacks, ROOK_RAYS[original.index])
 
     def _queen_moves(self, square: Square) -> List[List[Square]]:
         return self._rook_moves(square) + self._bishop_moves(square)
 
     def _king_moves(self, square: Square) -> List[List[Square]]:
         original = self.get_square(square=square)
-        color = original.piece.color
-        moves = [
-            self.get_square(square=original.up().left()),
-            self.get_square(square=original.up()),
-            self.get_square(square=original.up().right()),
-            self.get_square(square=original.right()),
-            self.get_square(square=original.right().down()),
-            self.get_square(square=original.down()),
-            self.get_square(square=original.down().left()),
-            self.get_square(square=original.left())
-        ]
-        possible_moves = []
-        for move in moves:
-            if move != Square('00') and (not move.piece or move.piece.color is not color):
-                possible_moves.append([move])
-        return possible_moves
+        friends = self.occupancy[original.piece.color.value]
+        return [[self._squares[target]] for target in KING_TARGETS[original.index] if not friends & bit(target)]
+
+    def attacks_from(self, index: int) -> int:
+        """
+        :param index: the index of an occupied square
+        :return: bitboard of every square attacked by the piece on that square
+        """
+        piece = self._squares[index].piece
+        piece_type = piece.piece_type
+        if piece_type is PieceType.PAWN:
+            return PAWN_ATTACKS[piece.color.value][index]
+        elif piece_type is PieceType.KNIGHT:
+            return KNIGHT_ATTACKS[index]
+        elif piece_type is PieceType.KING:
+            return KING_ATTACKS[index]
+
+        occupied = self.occupancy[0] | self.occupancy[1]
+        if piece_type is PieceType.BISHOP:
+            return bishop_attacks(index, occupied)
+        elif piece_type is PieceType.ROOK:
+            return rook_attacks(index, occupied)
+        return queen_attacks(index, occupied)
+
+    def attackers_to(self, index: int, color: Color, occupied: int) -> int:
+        """
+        :param index: the index of a square
+        :param color: the color of the attacking pieces
+        :param occupied: bitboard of the occupied squares that block sliding pieces
+        :return: bitboard of every piece of color that attacks the square
+        """
+        bitboards = self.bitboards
+        base = bitboard_index(PieceType.PAWN, color)
+        queens = bitboards[base + PieceType.QUEEN.value]
+        return (PAWN_ATTACKS[color.switch().value][index] & bitboards[base]) | \
+               (KNIGHT_ATTACKS[index] & bitboards[base + PieceType.KNIGHT.value]) | \
+               (KING_ATTACKS[index] & bitboards[base + PieceType.KING.value]) | \
+               (bishop_attacks(index, occupied) & (bitboards[base + PieceType.BISHOP.value] | queens)) | \
+               (rook_attacks(index, occupied) & (bitboards[base + PieceType.ROOK.value] | queens))
+
+    def is_square_attacked(self, square: Square, by_color: Color) -> bool:
+        """
+        Looks outwards from square along the lines that pawns, knights, kings and sliding pieces attack on
+        :param square: the square under inspection
+        :param by_color: the color of the attacking pieces
+        :return: true if any piece of by_color attacks square
+        """
+        index = self.get_square(square=square).index
+        bitboards = self.bitboards
+        base = bitboard_index(PieceType.PAWN, by_color)
+        if PAWN_ATTACKS[by_color.switch().value][index] & bitboards[base] or \
+                KNIGHT_ATTACKS[index] & bitboards[base + PieceType.KNIGHT.value] or \
+                KING_ATTACKS[index] & bitboards[base + PieceType.KING.value]:
+            return True
+
+        occupied = self.occupancy[0] | self.occupancy[1]
+        queens = bitboards[base + PieceType.QUEEN.value]
+        return bool(bishop_attacks(index, occupied) & (bitboards[base + PieceType.BISHOP.value] | queens) or
+                    rook_attacks(index, occupied) & (bitboards[base + PieceType.ROOK.value] | queens))
 
     def in_check(self, color: Color) -> bool:
         """
@@ -259,52 +342,29 @@ class Board:
         :param color: the color of the king under inspection
         :return: true if the king is in check, of the specified color
         """
-        king_location: Square = None
-        for row in self.squares:
-            for square in row:
-                if square.piece == Piece(PieceType.KING, color):
-                    king_location = square
-                    break
-
-        for row in self.squares:
-            for square in row:
-                if square.piece and square.piece.color != color:
-                    # The piece on this square is of the opposite color, and could possible pose a check
-                    moves = self.get_moves(square=square)
-                    for direction in moves:
-                        for move in direction:
-                            if move == king_location:
-                                return True
-        return False
+        king = self.king_squares[color.value]
+        return king >= 0 and self.is_square_attacked(self._squares[king], color.switch())
 
     def evaluate(self) -> float:
         """
         returns index representing what player is doing better. Negative number for black and positive for white
         1 point indicates a pawn, so if evaluate() returns -2, black is 2 pawns ahead
-        certain tactics will be used in this function, for example pins and doubled pawns
+        The pieces are scored by their squares as well as their value, see metaknight.evaluation
+        """
+        return self.evaluate_centipawns() / 100
+
+    def evaluate_centipawns(self) -> int:
+        """
+        :return: evaluate() in hundredths of a pawn, as an int
         """
-        # TODO: finish
-        return self.evaluate_by_material()
+        return tapered(self.middlegame_score, self.endgame_score, self.phase)
 
     def evaluate_by_material(self) -> float:
         """
         returns index representing what player is ahead in material using the standard value for pieces
         """
-        index: float = 0
-        for row in self.squares:
-            for square in row:
-                if square.piece:
-                    color = 1 if square.piece.color is Color.WHITE else -1
-                    if square.piece.piece_type == PieceType.PAWN:
-                        index += color * 1
-                    elif square.piece.piece_type == PieceType.KNIGHT:
-                        index += color * 3
-                    elif square.piece.piece_type == PieceType.BISHOP:
-                        index += color * 3
-                    elif square.piece.piece_type == PieceType.ROOK:
-                        index += color * 5
-                    elif square.piece.piece_type == PieceType.QUEEN:
-                        index += color * 9
-        return index
+        return self.material
 
 
+# The value of a piece in pawns, indexed by bitboard_index, negative for black
+_MATERIAL = Board.piece_values + [-value for value in Board.piece_values]
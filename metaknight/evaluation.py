@@ -0,0 +1,125 @@
+"""
+Piece-square tables for a tapered evaluation. Every piece is worth a middlegame score and an endgame score that depend
+on its square, and the two totals are blended by the game phase, which goes from MAX_PHASE with all the pieces on the
+board down to 0 when only kings and pawns are left.
+
+Board keeps the totals up to date in set_piece, so evaluating a position costs the same however many pieces it has.
+All the tables are indexed by bitboard_index and then by square index, and hold scores in centipawns from white's
+point of view: black's entries are mirrored and negated.
+"""
+from typing import List
+
+# Indexed by PieceType.value
+MIDDLEGAME_VALUES = [82, 337, 365, 477, 1025, 0]
+ENDGAME_VALUES = [94, 281, 297, 512, 936, 0]
+PHASE_WEIGHTS = [0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# The tables below are written as a board is seen by white, a8 first and h1 last
+
+_PAWN_MIDDLEGAME = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_PAWN_ENDGAME = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    20, 20, 20, 20, 20, 20, 20, 20,
+    10, 10, 10, 10, 10, 10, 10, 10,
+    5, 5, 5, 5, 5, 5, 5, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+_QUEEN = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+_KING_MIDDLEGAME = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+_KING_ENDGAME = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+_MIDDLEGAME_SQUARES = [_PAWN_MIDDLEGAME, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_MIDDLEGAME]
+_ENDGAME_SQUARES = [_PAWN_ENDGAME, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_ENDGAME]
+
+
+def _tables(values: List[int], squares: List[List[int]]) -> List[List[int]]:
+    tables = []
+    for sign, flip in ((1, 56), (-1, 0)):
+        # White's square index ^ 56 is its position in the tables above, black's is the square index itself
+        for value, table in zip(values, squares):
+            tables.append([sign * (value + table[index ^ flip]) for index in range(64)])
+    return tables
+
+
+MIDDLEGAME_TABLES = _tables(MIDDLEGAME_VALUES, _MIDDLEGAME_SQUARES)
+ENDGAME_TABLES = _tables(ENDGAME_VALUES, _ENDGAME_SQUARES)
+
+
+def tapered(middlegame: int, endgame: int, phase: int) -> int:
+    """
+    :return: the blend of the middlegame and endgame scores for a game phase, see MAX_PHASE
+    """
+    phase = min(phase, MAX_PHASE)
+    score = middlegame * phase + endgame * (MAX_PHASE - phase)
+    # Rounded towards zero, so that a position and its mirror image score the same for either player
+    return score // MAX_PHASE if score >= 0 else -(-score // MAX_PHASE)
@@ -1,16 +1,72 @@
-from metaknight.board import Board
-from metaknight.square import Square
+from metaknight.board import Board, bitboard_index
+from metaknight.square import Square, INDICES
 from metaknight.move import Move, InvalidNotationError, Castle
+from metaknight import movegen
+from metaknight.movegen import EN_PASSANT, KING_SIDE_CASTLE, QUEEN_SIDE_CASTLE
 from metaknight.piece import Piece, Color, PieceType
-from typing import List
+from metaknight.attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks, \
+    queen_attacks
+from metaknight.bitboard import iter_bits, popcount, DARK_SQUARES
+from metaknight.history import History
+from metaknight import zobrist
+from typing import Iterator, List
 
-from copy import deepcopy
+from copy import copy
+from enum import Enum
+import re
+
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# The piece letters of FEN: uppercase for white, lowercase for black
+FEN_PIECES = {letter: Piece(piece_type, color) for color, letters in ((Color.WHITE, 'PNBRQK'), (Color.BLACK, 'pnbrqk'))
+              for piece_type, letter in zip(PieceType, letters)}
+_FEN_LETTERS = 'PNBRQKpnbrqk'  # indexed by bitboard_index
+_FEN_EMPTY = {str(n): n for n in range(1, 9)}
+_FEN_COLORS = {'w': Color.WHITE, 'b': Color.BLACK}
+
+# Standard Algebraic Notation: castling, or the piece, the file and rank it moves from, the destination and promotion
+_SAN = re.compile(r'(?:(O-O-O|O-O|0-0-0|0-0)|([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?)[+#]?[!?]*$')
+_SAN_PIECES = {'N': PieceType.KNIGHT, 'B': PieceType.BISHOP, 'R': PieceType.ROOK, 'Q': PieceType.QUEEN,
+               'K': PieceType.KING}
+_FILES = [0x0101010101010101 << file for file in range(8)]
+_RANKS = [0xff << (8 * rank) for rank in range(8)]
+_KIND_MASK = 0xf000
+
+
+def encode_move(move: Move or Castle) -> int:
+    """
+    :return: the 16 bit code of move, see metaknight.movegen
+    """
+    if isinstance(move, Castle):
+        flag = KING_SIDE_CASTLE if move.king_side else QUEEN_SIDE_CASTLE
+        return movegen.encode(move.origin.index, move.destination.index, flag=flag)
+    return movegen.encode(move.origin.index, move.destination.index, move.promotion if move.promote else None,
+                          EN_PASSANT if move.en_passant else movegen.NORMAL)
+
+
+class GameStatus(Enum):
+    ONGOING = 0
+    CHECKMATE = 1  # the player to move has lost
+    STALEMATE = 2
+    INSUFFICIENT_MATERIAL = 3
+    FIFTY_MOVE_RULE = 4
+    REPETITION = 5
+
+    def is_over(self) -> bool:
+        return self is not GameStatus.ONGOING
+
+    def is_draw(self) -> bool:
+        return self.value >= GameStatus.STALEMATE.value
 
 
 class Game:
-    def __init__(self):
-        self.board: Board = Board()
-        self.game_history: List[Move] = []
+    def __init__(self, set_up: bool=True):
+        """
+        :param set_up: False to start with an empty board rather than the starting position
+        """
+        self.board: Board = Board(set_up)
+        self.game_history: History = History()  # The moves played, shared with copies of this game, see copy
         self.to_move: Color = Color.WHITE
 
         # For the following variables, the 0th index represents white, and the 1st index represents black
@@ -21,41 +77,215 @@ class Game:
         self.white_captured: List[PieceType] = []  # All captured white pieces
         self.black_captured: List[PieceType] = []  # All captured black pieces
 
+        # The en passant file of the starting position, for games set up from a position rather than from move 1
+        self.initial_en_passant_file: str = None
+        # The move counters of the starting position, see to_fen
+        self.initial_halfmove_clock: int = 0
+        self.initial_fullmove_number: int = 1
+
+        self._move_buffer = movegen.new_move_buffer()  # Scratch space for count_moves
+
+        # The state that play_move overwrites, one entry per move in game_history, so that undo_move can restore it
+        self._undo_stack: History = History()
+        # The Zobrist key of the position before each move in game_history, see repetitions
+        self._key_history: History = History()
+        self._halfmove_clock: int = 0
+
+        # The part of the Zobrist key that is not about the pieces on the board, see zobrist_key
+        self.state_key: int = zobrist.state_key(self.to_move, self.castling_rights())
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'Game':
+        """
+        :param fen: a position in Forsyth-Edwards Notation, for example
+        'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1'. The two move counters may be left out
+        :return: a new game that starts from the position
+        """
+        fields = fen.split()
+        if not 4 <= len(fields) <= 6:
+            raise ValueError(f'Expected 4 to 6 fields in the FEN {fen!r}')
+        rows = fields[0].split('/')
+        if len(rows) != 8:
+            raise ValueError(f'Expected 8 ranks in the FEN {fen!r}')
+
+        game = cls(set_up=False)
+        board = game.board
+        for rank, row in zip(range(7, -1, -1), rows):
+            squares = board.squares[rank]
+            file = 0
+            for letter in row:
+                if letter in _FEN_EMPTY:
+                    file += _FEN_EMPTY[letter]
+                elif letter in FEN_PIECES and file < 8:
+                    board.set_piece(FEN_PIECES[letter], square=squares[file])
+                    file += 1
+                else:
+                    raise ValueError(f'Invalid rank {row!r} in the FEN {fen!r}')
+            if file != 8:
+                raise ValueError(f'Invalid rank {row!r} in the FEN {fen!r}')
+
+        if fields[1] not in _FEN_COLORS:
+            raise ValueError(f'Invalid player to move in the FEN {fen!r}')
+        game.to_move = _FEN_COLORS[fields[1]]
+
+        castling = fields[2]
+        if castling != '-' and (not castling or set(castling) - set('KQkq')):
+            raise ValueError(f'Invalid castling rights in the FEN {fen!r}')
+        for color, king_side, queen_side in ((0, 'K', 'Q'), (1, 'k', 'q')):
+            game.h_rook_moved[color] = king_side not in castling
+            game.a_rook_moved[color] = queen_side not in castling
+
+        en_passant = fields[3]
+        if en_passant != '-':
+            # The pawn that can be taken en passant just moved, so it belongs to the player not to move
+            if en_passant not in INDICES or en_passant[1] != ('6' if game.to_move is Color.WHITE else '3'):
+                raise ValueError(f'Invalid en passant square in the FEN {fen!r}')
+            game.initial_en_passant_file = en_passant[0]
+
+        try:
+            game.initial_halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+            game.initial_fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise ValueError(f'Invalid move counters in the FEN {fen!r}') from None
+        if game.initial_halfmove_clock < 0 or game.initial_fullmove_number < 1:
+            raise ValueError(f'Invalid move counters in the FEN {fen!r}')
+        game._halfmove_clock = game.initial_halfmove_clock
+
+        game.refresh_state_key()
+        return game
+
+    def to_fen(self) -> str:
+        """
+        :return: the current position in Forsyth-Edwards Notation
+        """
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for square in self.board.squares[rank]:
+                piece = square.piece
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += _FEN_LETTERS[bitboard_index(piece.piece_type, piece.color)]
+            rows.append(row + str(empty) if empty else row)
+
+        castling = ''.join(letter for letter, allowed in zip('KQkq', sum(self.castling_rights(), [])) if allowed)
+        file = self.en_passant_file()
+        en_passant = f'{file}{6 if self.to_move is Color.WHITE else 3}' if file else '-'
+        return f'{"/".join(rows)} {"w" if self.to_move is Color.WHITE else "b"} {castling or "-"} {en_passant} ' \
+               f'{self.halfmove_clock()} {self.fullmove_number()}'
+
+    def halfmove_clock(self) -> int:
+        """
+        :return: the number of moves since the last capture or pawn move
+        """
+        return self._halfmove_clock
+
+    def fullmove_number(self) -> int:
+        """
+        :return: the number of the current move, which goes up after every move of black
+        """
+        black_started = (self.to_move is Color.BLACK) != (len(self.game_history) % 2 == 1)
+        return self.initial_fullmove_number + (len(self.game_history) + black_started) // 2
+
+    @property
+    def zobrist_key(self) -> int:
+        """
+        The Zobrist key of the current position, covering the pieces on the board, the player to move,
+        castling rights and the en passant file
+        """
+        return self.board.zobrist_key ^ self.state_key
+
     def play_move(self, notation: str=None, m: Move=None):
         move = None
         if notation:
             move = self.notation_parser(notation)
         else:
             move = m
+        # Tuples rather than lists, as the entries are shared with copies of this game and must never change
+        self._undo_stack.append((tuple(self.a_rook_moved), tuple(self.h_rook_moved), tuple(self.king_moved),
+                                 self.state_key, self._halfmove_clock))
+        self._key_history.append(self.zobrist_key)
         move.execute_move()
 
+        home_rank = '1' if self.to_move is Color.WHITE else '8'
         if move.piece_moved.piece_type == PieceType.KING:
             self.king_moved[self.to_move.value] = True
-        elif move.piece_moved.piece_type == PieceType.ROOK:
+        elif move.piece_moved.piece_type == PieceType.ROOK and move.origin.rank == home_rank:
             if move.origin.file == 'a':
                 self.a_rook_moved[self.to_move.value] = True
             elif move.origin.file == 'h':
                 self.h_rook_moved[self.to_move.value] = True
 
         captured = move.piece_captured
+        if captured and captured.piece_type is PieceType.ROOK and move.destination.rank == ('8' if home_rank == '1'
+                                                                                           else '1'):
+            # A rook captured on its starting square can't castle any more
+            if move.destination.file == 'a':
+                self.a_rook_moved[captured.color.value] = True
+            elif move.destination.file == 'h':
+                self.h_rook_moved[captured.color.value] = True
         if self.to_move is Color.WHITE and captured:
             self.black_captured.append(captured.piece_type)
         elif captured:
             self.white_captured.append(captured.piece_type)
+        if captured or move.piece_moved.piece_type is PieceType.PAWN:
+            self._halfmove_clock = 0
+        else:
+            self._halfmove_clock += 1
 
         self.to_move = self.to_move.switch()
         self.game_history.append(move)
+        self.state_key = zobrist.state_key(self.to_move, self.castling_rights(), self._en_passant_capture_file())
 
     def undo_move(self):
-        self.game_history[-1].undo()
-        del self.game_history[-1]
+        move = self.game_history.pop()
+        if move.board is not self.board:
+            # The move was played before this game was copied from another one
+            move = move.on_board(self.board)
+        move.undo()
+        a_rook_moved, h_rook_moved, king_moved, self.state_key, self._halfmove_clock = self._undo_stack.pop()
+        self.a_rook_moved, self.h_rook_moved, self.king_moved = list(a_rook_moved), list(h_rook_moved), list(king_moved)
+        self._key_history.pop()
+        if move.piece_captured:
+            captured = self.white_captured if move.piece_captured.color is Color.WHITE else self.black_captured
+            captured.pop()
         self.to_move = self.to_move.switch()
 
+    def refresh_state_key(self):
+        """
+        Recomputes state_key. Call this after setting the player to move, castling flags or initial_en_passant_file
+        by hand
+        """
+        self.state_key = zobrist.state_key(self.to_move, self.castling_rights(), self._en_passant_capture_file())
+
+    def castling_rights(self) -> List[List[bool]]:
+        """
+        :return: for each color, whether it may still castle king side and queen side, if the board allows it
+        """
+        return [[not self.king_moved[color] and not self.h_rook_moved[color],
+                 not self.king_moved[color] and not self.a_rook_moved[color]] for color in (0, 1)]
+
+    def _en_passant_capture_file(self) -> str:
+        """
+        :return: the en passant file, if a pawn of the player to move stands ready to capture on it. None otherwise
+        """
+        file = self.en_passant_file()
+        if file:
+            destination = Square.files.index(file) + (40 if self.to_move is Color.WHITE else 16)
+            pawns = self.board.bitboards[bitboard_index(PieceType.PAWN, self.to_move)]
+            if PAWN_ATTACKS[self.to_move.switch().value][destination] & pawns:
+                return file
+
     def en_passant_file(self) -> str:
         """
         :return: The file of a pawn that advanced forward two squares, legalizing en passant. None if no pawn did this
         """
-        if len(self.game_history) > 1:
+        if self.game_history:
             last_move = self.game_history[-1]
             piece_moved = last_move.piece_moved.piece_type
             origin_rank = int(last_move.origin.rank)
@@ -64,114 +294,126 @@ class Game:
 
             if piece_moved is PieceType.PAWN and origin_rank + increment == destination_rank:
                 return last_move.origin.file
+        else:
+            return self.initial_en_passant_file
 
-    def notation_parser(self, notation: str) -> Move or Castle:
-        if notation == 'O-O':
-            rook = self.h_rook_moved[self.to_move.value]
-            king = self.king_moved[self.to_move.value]
-            return Castle(self.board, self.to_move, king_side=True, king_moved=king, rook_moved=rook)
-        elif notation == 'O-O-O':
-            rook = self.a_rook_moved[self.to_move.value]
-            king = self.king_moved[self.to_move.value]
-            return Castle(self.board, self.to_move, king_side=False, king_moved=king, rook_moved=rook)
-
-        promotion: PieceType = PieceType.QUEEN
-        if not notation[-1].isdigit():
-            if notation[-1] == 'Q':
-                promotion = PieceType.QUEEN
-            elif notation[-1] == 'N':
-                promotion = PieceType.KNIGHT
-            elif notation[-1] == 'B':
-                promotion = PieceType.BISHOP
-            elif notation[-1] == 'R':
-                promotion = PieceType.ROOK
-            notation = notation[:-1]
-
-        destination, en_passant = self._find_destination(notation)
-        origin = self._find_origin(notation, destination)
-        return Move(self.board, self.to_move, origin, destination, en_passant, promotion=promotion)
-
-    def _find_destination(self, notation: str) -> (Square, bool):
-        if 'x' in notation and self.board.get_square(location=notation[-2:]).piece is None:
-            # A piece made a capture on a square that has no piece!
-            # This is an invalid notation, unless en passant happened here
-            if len(notation) == 4 and 97 <= ord(notation[0]) <= 104:
-                # A pawn made the capture
-                if notation[3] == '6' and self.to_move == Color.WHITE or \
-                        notation[3] == '3' and self.to_move == Color.BLACK:
-                    # The capture was made on the correct rank for en passant
-                    file = notation[2]
-                    rank = int(notation[3]) + 1 if self.to_move == Color.BLACK else int(notation[3]) - 1
-                    square = self.board.get_square(location=f'{file}{rank}')  # a pawn of opposite color should be here
-                    if square.piece and square.piece.color != self.to_move:
-                        # The board conditions for en passant were met
-                        en_passant_file = self.en_passant_file()
-                        if en_passant_file and en_passant_file == square.file:
-                            return self.board.get_square(location=notation[-2:]), True
-            raise InvalidNotationError()
-
-        return self.board.get_square(location=notation[-2:]), False
-
-    def _find_origin(self, notation: str, destination) -> Square:
-        increment = -1 if self.to_move is Color.WHITE else 1
-        if len(notation) == 2:
-            # A pawn simply advanced
-            file = notation[0]
-            rank = int(notation[1])
-            if (self.to_move is Color.WHITE and rank == 4) or (self.to_move is Color.BLACK and rank == 5):
-                # The pawn could have come from the start row, special case
-                if self.board.get_square(location=f'{file}{rank + increment}').piece is None:
-                    # if the square that the pawn came from has no piece there
-                    return self.board.get_square(location=f'{file}{rank + 2 * increment}')
-            return self.board.get_square(location=f'{file}{rank + increment}')
-        elif len(notation) == 4 and 97 <= ord(notation[0]) <= 104:
-            # A pawn captured another piece
-            file = notation[0]
-            rank = int(notation[3])
-            return self.board.get_square(location=f'{file}{rank + increment}')
-        elif len(notation) == 4 or len(notation) == 3:
-            # A piece was moved, or there was a capture
-            piece_moved = PieceType.KNIGHT
-            if notation[0] == 'B':
-                piece_moved = PieceType.BISHOP
-            elif notation[0] == 'R':
-                piece_moved = PieceType.ROOK
-            elif notation[0] == 'Q':
-                piece_moved = PieceType.QUEEN
-            elif notation[0] == 'K':
-                piece_moved = PieceType.KING
-
-            if len(notation) == 4 and notation[1] != 'x':
-                if notation[2].isdigit():
-                    rank = int(notation) - 1
-                    for square in self.board.squares[rank]:
-                        if square.piece == Piece(piece_moved, self.to_move):
-                            moves = self.board.get_moves(square=square)
-                            for direction in moves:
-                                for move in direction:
-                                    if move == destination:
-                                        return square
-                else:
-                    for rank in self.board.squares:
-                        file = Square.files.index(notation[1])
-                        square = rank[file]
-                        if square.piece == Piece(piece_moved, self.to_move):
-                            moves = self.board.get_moves(square=square)
-                            for direction in moves:
-                                for move in direction:
-                                    if move == destination:
-                                        return square
+    def notation_parser(self, notation: str, validate: bool=True) -> Move or Castle:
+        """
+        :param notation: a move in SAN, for example 'e4', 'Nbd7', 'R1a3', 'exd8=Q+' or 'O-O'. The = of a promotion
+        and the check and mate marks may be left out, and a promotion without a piece promotes to a queen. A notation
+        that more than one piece fits is read as a move of the piece nearest a1
+        :param validate: False if the move is already known to be legal, for example if it comes from a trusted
+        database of games, in which case it is found with the attack tables alone
+        :return: the legal move of the player to move that notation stands for
+        """
+        match = _SAN.match(notation)
+        if not match:
+            raise InvalidNotationError(f'{notation} is not a move')
+        castle, letter, file, rank, destination, promotion = match.groups()
+        board = self.board
+        to_move = self.to_move
+        if castle:
+            king_side = len(castle) == 3
+            if validate:
+                kind = movegen.KING_SIDE_CASTLE_CODE if king_side else movegen.QUEEN_SIDE_CASTLE_CODE
+                buffer = self._move_buffer
+                if not any(buffer[i] & _KIND_MASK == kind for i in range(self.generate_move_codes(buffer))):
+                    raise InvalidNotationError(f'{notation} is not a legal move')
+            return Castle(board, to_move, king_side=king_side, validate=False)
+
+        destination = INDICES[destination]
+        target = 1 << destination
+        piece_type = _SAN_PIECES[letter] if letter else PieceType.PAWN
+        pieces = board.bitboards[bitboard_index(piece_type, to_move)]
+        occupied = board.occupancy[0] | board.occupancy[1]
+        en_passant = False
+        if piece_type is PieceType.PAWN:
+            if file and not _FILES[ord(file) - 97] & target:
+                candidates = PAWN_ATTACKS[to_move.switch().value][destination] & pieces
+                en_passant = not occupied & target
+                if validate and en_passant and (self.en_passant_file() != Square.files[destination & 7] or
+                                                destination >> 3 != (5 if to_move is Color.WHITE else 2)):
+                    raise InvalidNotationError(f'{notation} is not a legal move')
+            else:
+                if validate and occupied & target:
+                    raise InvalidNotationError(f'{notation} is not a legal move')
+                behind = destination - 8 if to_move is Color.WHITE else destination + 8
+                if 0 <= behind < 64 and not occupied & (1 << behind) and \
+                        destination >> 3 == (3 if to_move is Color.WHITE else 4):
+                    behind = behind - 8 if to_move is Color.WHITE else behind + 8
+                candidates = (1 << behind) & pieces if 0 <= behind < 64 else 0
+        elif piece_type is PieceType.KNIGHT:
+            candidates = KNIGHT_ATTACKS[destination] & pieces
+        elif piece_type is PieceType.BISHOP:
+            candidates = bishop_attacks(destination, occupied) & pieces
+        elif piece_type is PieceType.ROOK:
+            candidates = rook_attacks(destination, occupied) & pieces
+        elif piece_type is PieceType.QUEEN:
+            candidates = queen_attacks(destination, occupied) & pieces
+        else:
+            candidates = KING_ATTACKS[destination] & pieces
+        if file:
+            candidates &= _FILES[ord(file) - 97]
+        if rank:
+            candidates &= _RANKS[ord(rank) - 49]
 
+        if not validate and candidates & (candidates - 1):
+            # SAN leaves out what a pin already decides
+            for origin, allowed in movegen.pinned_pieces(board, to_move).items():
+                if not allowed & target:
+                    candidates &= ~(1 << origin)
+        squares = board.squares
+        destination = squares[destination >> 3][destination & 7]
+        for origin in iter_bits(candidates):
+            try:
+                return Move(board, to_move, squares[origin >> 3][origin & 7], destination, en_passant,
+                            promotion=_SAN_PIECES[promotion] if promotion else PieceType.QUEEN, validate=validate)
+            except InvalidNotationError:
+                continue
+        raise InvalidNotationError(f'{notation} is not a legal move')
+
+    def san(self, move: Move or Castle) -> str:
+        """
+        :param move: a legal move of the player to move
+        :return: move in Standard Algebraic Notation, for example 'Nbd7', 'exd8=Q+' or 'O-O#'
+        """
+        if isinstance(move, Castle):
+            notation = 'O-O' if move.king_side else 'O-O-O'
+        else:
+            origin = move.origin.index
+            destination = move.destination.index
+            piece_type = move.piece_moved.piece_type
+            capture = 'x' if move.piece_captured else ''
+            if piece_type is PieceType.PAWN:
+                notation = f'{move.origin.file}{capture}{move.destination}' if capture else str(move.destination)
+                if move.promote:
+                    notation += '=' + repr(move.promotion)
             else:
-                for rank in self.board.squares:
-                    for square in rank:
-                        if square.piece == Piece(piece_moved, self.to_move):
-                            moves = self.board.get_moves(square=square)
-                            for direction in moves:
-                                for move in direction:
-                                    if move == destination:
-                                        return square
-        raise InvalidNotationError()
+                # The other pieces of the same kind that can move to the destination
+                pieces = self.board.bitboards[bitboard_index(piece_type, self.to_move)]
+                buffer = self._move_buffer
+                others = 0
+                for i in range(self.generate_move_codes(buffer)):
+                    code = buffer[i]
+                    if (code >> 6) & 0x3f == destination and code & 0x3f != origin and pieces >> (code & 0x3f) & 1:
+                        others |= 1 << (code & 0x3f)
+                disambiguation = ''
+                if others:
+                    if not others & _FILES[origin & 7]:
+                        disambiguation = move.origin.file
+                    elif not others & _RANKS[origin >> 3]:
+                        disambiguation = move.origin.rank
+                    else:
+                        disambiguation = str(move.origin)
+                notation = f'{repr(piece_type)}{disambiguation}{capture}{move.destination}'
+
+        self.play_move(m=move)
+        try:
+            if self.board.in_check(self.to_move):
+                notation += '#' if not self.count_moves() else '+'
+        finally:
+            self.undo_move()
+        return notation
 
     def generate_moves(self, to_move: Color=None) -> List[Move or Castle]:
         """
@@ -179,81 +421,164 @@ class Game:
         """
         if not to_move:
             to_move = self.to_move
-        moves: List[Move or Castle] = []
-        for row in self.board.squares:
-            for square in row:
-                if square.piece and square.piece.color is to_move:
-                    for i in self.board.get_moves(square=square):
-                        for j in i:
-                            try:
-                                moves.append(Move(self.board, square.piece.color, square, j))
-                            except InvalidNotationError:
-                                pass
-        try:
-            moves.append(self.notation_parser("O-O"))
-        except InvalidNotationError:
-            pass
+        buffer = self._move_buffer
+        count = self.generate_move_codes(buffer, to_move)
+        return [self.decode_move(buffer[i], to_move) for i in range(count)]
 
-        try:
-            moves.append(self.notation_parser("O-O-O"))
-        except InvalidNotationError:
-            pass
+    def generate_move_codes(self, buffer: List[int], to_move: Color=None, stage: int=movegen.ALL_MOVES) -> int:
+        """
+        Writes the legal moves as 16 bit codes (see metaknight.movegen) into buffer, which is reused rather than
+        allocating a move object per move. Turn a code into a Move or Castle with decode_move when it is needed
+        :param buffer: a buffer from metaknight.movegen.new_move_buffer
+        :param stage: movegen.CAPTURES or movegen.QUIETS to write only those moves
+        :return: the number of moves written
+        """
+        if not to_move:
+            to_move = self.to_move
+        king_side = not self.king_moved[to_move.value] and not self.h_rook_moved[to_move.value]
+        queen_side = not self.king_moved[to_move.value] and not self.a_rook_moved[to_move.value]
+        en_passant_file = self.en_passant_file() if to_move is self.to_move else None
+        return movegen.generate_moves(self.board, to_move, buffer, en_passant_file, king_side, queen_side, stage)
 
-        file = self.en_passant_file()
-        if file:
-            rank = '5' if to_move is Color.WHITE else '4'
-            capture = '6' if to_move is Color.WHITE else '3'
-            if file != 'a':
-                f = Square.files.index(file) - 1
-                origin = self.board.get_square(location=f'{Square.files[f]}{rank}')
-                destination = self.board.get_square(location=f'{file}{capture}')
-                try:
-                    m = Move(self.board, to_move, origin, destination, en_passant=True)
-                    moves.append(m)
-                except InvalidNotationError:
-                    pass
-
-            if file != 'h':
-                f = Square.files.index(file) + 1
-                origin = self.board.get_square(location=f'{Square.files[f]}{rank}')
-                destination = self.board.get_square(location=f'{file}{capture}')
-                try:
-                    m = Move(self.board, to_move, origin, destination, en_passant=True)
-                    moves.append(m)
-                except InvalidNotationError:
-                    pass
-        return moves
-
-    def copy(self):
-        """
-        This function returns a copy of this current game
-        """
-
-        return deepcopy(self)
+    def decode_move(self, code: int, to_move: Color=None) -> Move or Castle:
+        """
+        :param code: a move code from generate_move_codes for the current position
+        :return: the move it stands for
+        """
+        if not to_move:
+            to_move = self.to_move
+        origin, destination, promotion, flag = movegen.decode(code)
+        if flag == KING_SIDE_CASTLE or flag == QUEEN_SIDE_CASTLE:
+            return Castle(self.board, to_move, king_side=flag == KING_SIDE_CASTLE, validate=False)
+        squares = self.board.squares
+        return Move(self.board, to_move, squares[origin >> 3][origin & 7], squares[destination >> 3][destination & 7],
+                    en_passant=flag == EN_PASSANT, promotion=promotion or PieceType.QUEEN, validate=False)
+
+    def has_legal_move(self) -> bool:
+        """
+        :return: True if the player to move has a legal move. This stops at the first move found, so it is much cheaper
+        than generating them all
+        """
+        return movegen.has_legal_move(self.board, self.to_move, self.en_passant_file())
+
+    def count_moves(self) -> int:
+        """
+        :return: the number of legal moves of the player to move, without building them
+        """
+        return self.generate_move_codes(self._move_buffer)
+
+    def copy(self) -> 'Game':
+        """
+        This function returns a copy of this current game. The copy shares the moves played so far with this game rather
+        than copying them, so this costs the same however long the game is, and either game can go on or undo moves
+        without changing the other
+        """
+        game = copy(self)
+        game.board = self.board.copy()
+        game.game_history = self.game_history.copy()
+        game._undo_stack = self._undo_stack.copy()
+        game._key_history = self._key_history.copy()
+        game.a_rook_moved = self.a_rook_moved.copy()
+        game.h_rook_moved = self.h_rook_moved.copy()
+        game.king_moved = self.king_moved.copy()
+        game.white_captured = self.white_captured.copy()
+        game.black_captured = self.black_captured.copy()
+        game._move_buffer = movegen.new_move_buffer()
+        return game
 
     def possible_games(self, n: int) -> List[List[Move or Castle]]:
         """
         :param n: number of moves
         :return: List of lists of possible moves for the next n moves
         """
-        games: List[List[Move or Castle]] = []
+        return list(self.iter_possible_games(n))
+
+    def iter_possible_games(self, n: int) -> Iterator[List[Move or Castle]]:
+        """
+        Lazily walks every line of n moves by playing and undoing moves on this game, yielding each line as it is
+        reached. The game must not be changed while the lines are being consumed. It is back in its current position
+        once the generator is exhausted or closed, so it is fine to stop early
+        :param n: number of moves
+        """
+        yield from self._walk_lines(n, [])
+
+    def _walk_lines(self, n: int, line: List[Move or Castle]) -> Iterator[List[Move or Castle]]:
         if n == 0:
-            return [[]]
+            yield list(line)
+            return
         for move in self.generate_moves():
-            new_game = self.copy()
-            move.board = new_game.board
-            new_game.play_move(m=move)
-            for g in new_game.possible_games(n-1):
-                li = [move] + g
-                games.append(li)
-        return games
+            self.play_move(m=move)
+            line.append(move)
+            try:
+                yield from self._walk_lines(n - 1, line)
+            finally:
+                line.pop()
+                self.undo_move()
+
+    def game_status(self) -> GameStatus:
+        """
+        :return: whether the game is over, and why. Checkmate and stalemate come before the draws that the players
+        could claim, as they end the game at once
+        """
+        if not self.has_legal_move():
+            return GameStatus.CHECKMATE if self.board.in_check(self.to_move) else GameStatus.STALEMATE
+        if self.is_draw_by_insufficient_material():
+            return GameStatus.INSUFFICIENT_MATERIAL
+        if self.is_draw_by_fifty_move_rule():
+            return GameStatus.FIFTY_MOVE_RULE
+        if self.is_draw_by_repetition():
+            return GameStatus.REPETITION
+        return GameStatus.ONGOING
 
     def is_stalemate(self):
-        return len(self.generate_moves()) == 0 and self.board.in_check(self.to_move) is False
+        return not self.has_legal_move() and self.board.in_check(self.to_move) is False
 
     def is_checkmate(self):
-        return len(self.generate_moves()) == 0 and self.board.in_check(self.to_move) is True
+        return not self.has_legal_move() and self.board.in_check(self.to_move) is True
 
-    def is_draw_by_insufficient_material(self):
-        return len(self.white_captured) == 15 and len(self.black_captured) == 15
+    def repetitions(self) -> int:
+        """
+        :return: how many times the current position has occurred in this game, counting this time. Only the positions
+        since the last capture or pawn move are looked at, as no earlier position can occur again
+        """
+        key = self.zobrist_key
+        count = 1
+        plies = 0
+        for previous in reversed(self._key_history):
+            plies += 1
+            if plies > self._halfmove_clock:
+                break
+            # Only positions with the same player to move can match, they are an even number of plies back
+            if plies % 2 == 0 and previous == key:
+                count += 1
+        return count
+
+    def is_draw_by_repetition(self) -> bool:
+        """
+        :return: True if the current position has occurred three times
+        """
+        return self.repetitions() >= 3
+
+    def is_draw_by_fifty_move_rule(self) -> bool:
+        """
+        :return: True if fifty moves of each player were played without a capture or pawn move
+        """
+        return self._halfmove_clock >= 100
+
+    def is_draw_by_insufficient_material(self) -> bool:
+        """
+        :return: True if neither player has the pieces to checkmate with: a king against a king and at most one knight
+        or bishop, or kings and bishops that all stand on squares of the same colour
+        """
+        bitboards = self.board.bitboards
+        for piece_type in (PieceType.PAWN, PieceType.ROOK, PieceType.QUEEN):
+            if bitboards[bitboard_index(piece_type, Color.WHITE)] | bitboards[bitboard_index(piece_type, Color.BLACK)]:
+                return False
+        knights = bitboards[bitboard_index(PieceType.KNIGHT, Color.WHITE)] | \
+            bitboards[bitboard_index(PieceType.KNIGHT, Color.BLACK)]
+        bishops = bitboards[bitboard_index(PieceType.BISHOP, Color.WHITE)] | \
+            bitboards[bitboard_index(PieceType.BISHOP, Color.BLACK)]
+        if popcount(knights | bishops) <= 1:
+            return True
+        return not knights and (not bishops & DARK_SQUARES or not bishops & ~DARK_SQUARES)
 
@@ -0,0 +1,80 @@
+"""
+A persistent stack: pushing or popping changes which entry a History points to, never the entries themselves, so
+copies of a History share every entry they have in common. Copying one costs the same however long it is, which is
+what lets Game.copy fork a game in constant time.
+"""
+from typing import Any, Iterable, Iterator, Optional
+
+
+class _Entry:
+    __slots__ = ('value', 'below', 'length')
+
+    def __init__(self, value: Any, below: Optional['_Entry']):
+        self.value = value
+        self.below = below
+        self.length = below.length + 1 if below else 1
+
+
+class History:
+    __slots__ = ('_top',)
+
+    def __init__(self, values: Iterable=()):
+        self._top: Optional[_Entry] = None
+        for value in values:
+            self.append(value)
+
+    def append(self, value: Any):
+        self._top = _Entry(value, self._top)
+
+    def pop(self) -> Any:
+        top = self._top
+        if top is None:
+            raise IndexError('pop from an empty History')
+        self._top = top.below
+        return top.value
+
+    def copy(self) -> 'History':
+        history = History()
+        history._top = self._top
+        return history
+
+    def __len__(self) -> int:
+        return self._top.length if self._top else 0
+
+    def __bool__(self) -> bool:
+        return self._top is not None
+
+    def __getitem__(self, index: int) -> Any:
+        """
+        Negative indices count from the top, so history[-1] is the last value appended and costs O(1)
+        """
+        length = len(self)
+        if index >= 0:
+            index -= length
+        if not -length <= index < 0:
+            raise IndexError('History index out of range')
+        entry = self._top
+        for _ in range(-1 - index):
+            entry = entry.below
+        return entry.value
+
+    def __reversed__(self) -> Iterator:
+        entry = self._top
+        while entry:
+            yield entry.value
+            entry = entry.below
+
+    def __iter__(self) -> Iterator:
+        return iter(list(reversed(self))[::-1])
+
+    def __eq__(self, other):
+        if isinstance(other, History):
+            return list(self) == list(other)
+        return isinstance(other, list) and list(self) == other
+
+    def __repr__(self):
+        return f'History({list(self)!r})'
+
+    def __reduce__(self):
+        # Rebuilt from a list, so that copying or pickling a long history doesn't recurse once per entry
+        return History, (list(self),)
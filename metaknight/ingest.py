@@ -0,0 +1,179 @@
+"""
+Bulk PGN ingestion. A PGN file is split at game boundaries into chunks, the chunks are replayed by a pool of worker
+processes, and every chunk is written out as one columnar batch: a gzipped JSON object of parallel lists, one table
+for games and one for the positions they go through.
+
+    {"games": {"headers": [...], "moves": ["e4 e5 Nf3", ...], "result": ["1-0", ...], "plies": [3, ...]},
+     "positions": {"game": [0, 0, 0, 0, ...], "ply": [0, 1, 2, 3, ...], "fen": [...], "move": ["e4", ...]},
+     "errors": [[1, "InvalidNotationError: Qd9"], ...]}
+
+positions.game is the index of a game in the same batch. A game that can't be replayed is left out, and listed in errors
+with its index in the chunk.
+
+Run it from the command line with
+    python -m metaknight.ingest games.pgn.gz out/ --workers 8 --trust
+"""
+from metaknight.pgn import read_games, replay, positions, open_pgn, _TOKEN
+from metaknight.move import InvalidNotationError
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from typing import Iterator, List, NamedTuple, TextIO, Union
+import argparse
+import gzip
+import json
+import os
+import sys
+
+
+class IngestStats(NamedTuple):
+    games: int
+    positions: int
+    errors: int
+    batches: int
+
+
+def iter_chunks(lines: Iterator[str], games_per_chunk: int) -> Iterator[str]:
+    """
+    Splits PGN text at game boundaries, without parsing the moves
+    :return: pieces of the text holding games_per_chunk games each, the last one possibly fewer
+    """
+    chunk = []
+    games = 0
+    in_movetext = True
+    in_comment = False
+    for line in lines:
+        if in_comment:
+            # A line of a { } comment, even if it looks like a header, see metaknight.pgn._read_games
+            in_comment = _in_comment_after(line, True)
+        elif line.startswith('['):
+            if in_movetext:
+                # The headers of a new game
+                if games == games_per_chunk:
+                    yield ''.join(chunk)
+                    chunk = []
+                    games = 0
+                games += 1
+                in_movetext = False
+        elif line.strip() and not line.startswith('%'):
+            in_movetext = True
+            in_comment = _in_comment_after(line, False)
+        chunk.append(line)
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _in_comment_after(line: str, in_comment: bool) -> bool:
+    """
+    :param in_comment: True if line starts inside a { } comment
+    :return: True if a { } comment is still open at the end of line
+    """
+    for token in _TOKEN.findall(line):
+        if in_comment:
+            in_comment = token != '}'
+        elif token == '{':
+            in_comment = True
+        elif token == ';':
+            break
+    return in_comment
+
+
+def replay_chunk(text: str, trust: bool=False, with_positions: bool=True) -> dict:
+    """
+    :param text: PGN text, such as a chunk from iter_chunks
+    :param trust: True to skip checking that the moves are legal, see metaknight.pgn
+    :param with_positions: False to leave the positions table empty
+    :return: the games of text as a columnar batch, see the module docstring
+    """
+    games = {'headers': [], 'moves': [], 'result': [], 'plies': []}
+    table = {'game': [], 'ply': [], 'fen': [], 'move': []}
+    errors = []
+    for i, pgn in enumerate(read_games(StringIO(text))):
+        try:
+            if with_positions:
+                records = list(positions(pgn, trust))
+            else:
+                replay(pgn, trust)
+                records = []
+        except (InvalidNotationError, ValueError) as error:
+            # A move that can't be played, or a bad FEN header. Anything else is a bug, and is left to fail loudly
+            errors.append([i, f'{type(error).__name__}: {error}'])
+            continue
+        number = len(games['result'])
+        games['headers'].append(pgn.headers)
+        games['moves'].append(' '.join(pgn.moves))
+        games['result'].append(pgn.result)
+        games['plies'].append(len(pgn.moves))
+        for record in records:
+            table['game'].append(number)
+            table['ply'].append(record.ply)
+            table['fen'].append(record.fen)
+            table['move'].append(record.move)
+    return {'games': games, 'positions': table, 'errors': errors}
+
+
+def write_batch(batch: dict, path: str):
+    with gzip.open(path, 'wt', encoding='utf-8') as file:
+        json.dump(batch, file, separators=(',', ':'))
+
+
+def read_batch(path: str) -> dict:
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def ingest(source: Union[str, os.PathLike, TextIO], out_dir: str, workers: int=None, games_per_batch: int=1000,
+           trust: bool=False, with_positions: bool=True) -> IngestStats:
+    """
+    Replays every game of source in a pool of processes, writing one batch file per chunk of games_per_batch games
+    into out_dir, named batch-000000.json.gz, batch-000001.json.gz and so on in the order of the games
+    :param source: the path of a PGN file, which may be gzipped, or a PGN file opened as text
+    :param workers: the number of processes, None for one per CPU
+    :param trust: True to skip checking that the moves are legal, see metaknight.pgn
+    :param with_positions: False to write the games table only
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    counts = [0, 0, 0, 0]
+
+    def write(batch: dict):
+        write_batch(batch, os.path.join(out_dir, f'batch-{counts[3]:06}.json.gz'))
+        counts[0] += len(batch['games']['result'])
+        counts[1] += len(batch['positions']['fen'])
+        counts[2] += len(batch['errors'])
+        counts[3] += 1
+
+    file = open_pgn(source) if isinstance(source, (str, os.PathLike)) else source
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Only a few chunks per worker are in flight at once, so memory does not grow with the file
+            pending = []
+            for chunk in iter_chunks(file, games_per_batch):
+                pending.append(executor.submit(replay_chunk, chunk, trust, with_positions))
+                if len(pending) >= 2 * workers:
+                    write(pending.pop(0).result())
+            for future in pending:
+                write(future.result())
+    finally:
+        if file is not source:
+            file.close()
+    return IngestStats(*counts)
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m metaknight.ingest',
+                                     description='Replay a PGN file into columnar batches of games and positions')
+    parser.add_argument('pgn', help='the PGN file, which may be gzipped')
+    parser.add_argument('out', help='the directory to write the batches to')
+    parser.add_argument('--workers', type=int, default=None, help='the number of processes, one per CPU by default')
+    parser.add_argument('--games-per-batch', type=int, default=1000)
+    parser.add_argument('--trust', action='store_true', help='skip checking that the moves are legal')
+    parser.add_argument('--no-positions', action='store_true', help='only write the games table')
+    args = parser.parse_args(argv)
+
+    stats = ingest(args.pgn, args.out, args.workers, args.games_per_batch, args.trust, not args.no_positions)
+    print(f'games: {stats.games}  positions: {stats.positions}  errors: {stats.errors}  batches: {stats.batches}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,7 @@
 from metaknight.board import Board
 from metaknight.square import Square
 from metaknight.piece import Color, Piece, PieceType
-
-from copy import deepcopy
+from copy import copy
 
 
 class InvalidNotationError(Exception):
@@ -11,7 +10,7 @@ class InvalidNotationError(Exception):
 
 class Move:
     def __init__(self, board: Board, to_move: Color, origin: Square, destination: Square,
-                 en_passant: bool=False, promotion: PieceType=PieceType.QUEEN):
+                 en_passant: bool=False, promotion: PieceType=PieceType.QUEEN, validate: bool=True):
         """
         :param board: The board that this move is being played on
         :param to_move: The player that made this move: Color.WHITE or Color.BLACK
@@ -19,6 +18,8 @@ class Move:
         :param destination: The square that the piece moves to
         :param en_passant: True if this move makes use of the en_passant rule
         :param promotion: the piece that a pawn gets promoted to it it makes its way to the other side
+        :param validate: False if the move is already known to be legal, for example if it came from
+        metaknight.movegen, in which case it is not checked again
         """
 
         self.board: Board = board
@@ -35,7 +36,7 @@ class Move:
                 (self.to_move == Color.WHITE and self.destination.rank == '8' or
                  self.to_move == Color.BLACK and self.destination.rank == '1'):
             self.promote = True
-        if not self.origin.piece or self.origin.piece.color != self.to_move:
+        if validate and (not self.origin.piece or self.origin.piece.color != self.to_move):
             raise InvalidNotationError
 
         if self.en_passant:
@@ -43,10 +44,11 @@ class Move:
             square = func(self.destination)
             self.piece_captured: Piece = self.board.get_square(square=square).piece
         else:
-            if self.destination.piece and self.destination.piece.color == to_move:
+            if validate and self.destination.piece and self.destination.piece.color == to_move:
                 raise InvalidNotationError
             self.piece_captured: Piece = self.destination.piece  # None if no piece was captured
-        self._not_in_check()
+        if validate:
+            self._not_in_check()
 
     def __repr__(self):
         if self.en_passant:
@@ -56,17 +58,28 @@ class Move:
         else:
             return f'{self.origin} -> {self.destination}'
 
+    def on_board(self, board: Board) -> 'Move':
+        """
+        :param board: a copy of the board this move was played on, see Game.copy
+        :return: this move as played on board. This move itself is left as it is, as it may be shared by other games
+        """
+        move = copy(self)
+        move.board = board
+        move.origin = board.get_square(square=self.origin)
+        move.destination = board.get_square(square=self.destination)
+        return move
+
     def execute_move(self):
-        self.board.get_square(square=self.origin).piece = None
+        self.board.set_piece(None, square=self.origin)
 
         if self.promote:
-            self.board.get_square(square=self.destination).piece = Piece(self.promotion, self.to_move)
+            self.board.set_piece(Piece(self.promotion, self.to_move), square=self.destination)
         else:
-            self.board.get_square(square=self.destination).piece = self.piece_moved
+            self.board.set_piece(self.piece_moved, square=self.destination)
             if self.en_passant:
                 func = Square.up if self.to_move is Color.BLACK else Square.down
                 square = func(self.destination)
-                self.board.get_square(square=square).piece = None
+                self.board.set_piece(None, square=square)
 
         self.origin: Square = self.board.get_square(square=self.origin)
         self.destination: Square = self.board.get_square(square=self.destination)
@@ -76,35 +89,34 @@ class Move:
         Precondition: The last move executed in the board was this move
         This function undoes this move
         """
-        self.board.get_square(square=self.origin).piece = self.piece_moved
-        self.board.get_square(square=self.destination).piece = self.piece_captured
+        self.board.set_piece(self.piece_moved, square=self.origin)
+        self.board.set_piece(self.piece_captured, square=self.destination)
         if self.en_passant:
             func = Square.up if self.to_move is Color.BLACK else Square.down
             square = func(self.destination)
-            self.board.get_square(square=square).piece = self.piece_captured
-            self.board.get_square(square=self.destination).piece = None
+            self.board.set_piece(self.piece_captured, square=square)
+            self.board.set_piece(None, square=self.destination)
 
         self.origin: Square = self.board.get_square(square=self.origin)
         self.destination: Square = self.board.get_square(square=self.destination)
 
     def _not_in_check(self):
         """
-        This function simulates the new board state if the desired move is executed. If the new board state
-        has a check in it, I throw an InvalidNotationError
+        This function plays the move on the board, looks for a check and then takes the move back, so the board is
+        left as it was. If the move leaves the player who made it in check, I throw an InvalidNotationError
         """
+        self.execute_move()
+        in_check = self.board.in_check(self.to_move)
+        self.undo()
 
-        board_copy = deepcopy(self.board)
-        board_copy.get_square(square=self.origin).piece = None
-        board_copy.get_square(square=self.destination).piece = self.piece_moved
-
-        if board_copy.in_check(self.to_move):
+        if in_check:
             raise InvalidNotationError('This move puts you in check')
 
 
 class Castle:
     def __init__(self, board: Board, to_move: Color,
-                 king_side: bool=True, king_moved: bool=False, rook_moved: bool=False):
-        if board.in_check(to_move) or king_moved or rook_moved:
+                 king_side: bool=True, king_moved: bool=False, rook_moved: bool=False, validate: bool=True):
+        if validate and (board.in_check(to_move) or king_moved or rook_moved):
             raise InvalidNotationError
         rank = '1' if to_move is Color.WHITE else '8'
         direction = Square.right if king_side else Square.left
@@ -113,10 +125,12 @@ class Castle:
 
         origin = Square(f'e{rank}')
 
+        self.board: Board = board
         self.king_side = king_side
-        self.king_move1 = Move(board, to_move, origin, direction(origin))
-        self.king_move2 = Move(board, to_move, origin, direction(direction(origin)))
-        self.rook_move = Move(board, to_move, Square(f'{rook_file}{rank}'), Square(f'{rook_dest}{rank}'))
+        self.king_move1 = Move(board, to_move, origin, direction(origin), validate=validate)
+        self.king_move2 = Move(board, to_move, origin, direction(direction(origin)), validate=validate)
+        self.rook_move = Move(board, to_move, Square(f'{rook_file}{rank}'), Square(f'{rook_dest}{rank}'),
+                              validate=validate)
         self.origin = origin
         self.destination = direction(direction(origin))
         self.piece_moved: Piece = Piece(PieceType.KING, to_move)
@@ -125,8 +139,28 @@ class Castle:
     def __repr__(self):
         return 'king-side castle' if self.king_side else 'queen-side castle'
 
+    def on_board(self, board: Board) -> 'Castle':
+        """
+        :return: this castle as played on board, see Move.on_board
+        """
+        castle = copy(self)
+        castle.board = board
+        castle.king_move1 = self.king_move1.on_board(board)
+        castle.king_move2 = self.king_move2.on_board(board)
+        castle.rook_move = self.rook_move.on_board(board)
+        return castle
+
     def execute_move(self):
         self.king_move1.execute_move()
         self.king_move2.execute_move()
         self.rook_move.execute_move()
 
+    def undo(self):
+        """
+        Precondition: The last move executed in the board was this castle
+        This function undoes this castle
+        """
+        self.rook_move.undo()
+        self.king_move2.undo()
+        self.king_move1.undo()
+
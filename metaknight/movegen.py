@@ -0,0 +1,284 @@
+"""
+Legal move generation. The pieces giving check and the pinned pieces of the side to move are found first, so every
+move generated is legal and nothing has to be tried on the board and rejected.
+
+Moves are generated as 16 bit codes, written into a preallocated buffer (see new_move_buffer) so that no object is
+created per move. A code is origin | destination << 6 | kind << 12, where origin and destination are square
+indices (see Square.index) and kind is 0 for an ordinary move, the value of the PieceType a pawn promotes to, or one of
+the *_CODE constants below. legal_moves decodes them into tuples (origin, destination, promotion, flag), where
+promotion is the PieceType a pawn promotes to or None, and flag is one of NORMAL, EN_PASSANT, KING_SIDE_CASTLE and
+QUEEN_SIDE_CASTLE
+"""
+from metaknight.board import Board, bitboard_index
+from metaknight.piece import Color, PieceType
+from metaknight.bitboard import bit, lsb, iter_bits
+from metaknight.attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, \
+    rook_attacks, bishop_attacks, queen_attacks
+from typing import List, Optional, Tuple
+
+NORMAL = 0
+EN_PASSANT = 1
+KING_SIDE_CASTLE = 2
+QUEEN_SIDE_CASTLE = 3
+
+PROMOTIONS = (PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT)
+
+# The kind of a move code, in its top 4 bits. Kinds 1 to 4 are promotions to the PieceType of that value
+_KIND_SHIFT = 12
+EN_PASSANT_CODE = (EN_PASSANT + 4) << _KIND_SHIFT
+KING_SIDE_CASTLE_CODE = (KING_SIDE_CASTLE + 4) << _KIND_SHIFT
+QUEEN_SIDE_CASTLE_CODE = (QUEEN_SIDE_CASTLE + 4) << _KIND_SHIFT
+_PROMOTION_CODES = tuple(promotion.value << _KIND_SHIFT for promotion in PROMOTIONS)
+_PIECE_TYPES = tuple(PieceType)
+
+# No legal position has more moves than this
+MAX_MOVES = 256
+
+# Which moves generate_moves writes, so that a search can look at captures before generating the quiet moves
+ALL_MOVES = 0
+CAPTURES = 1  # captures, en passant and promotions
+QUIETS = 2  # every other move, castling included
+
+ALL_SQUARES = (1 << 64) - 1
+RANK_1 = 0xff
+RANK_8 = 0xff << 56
+
+
+def new_move_buffer() -> List[int]:
+    """
+    :return: a buffer big enough for the moves of any position, to pass to generate_moves. It is a list rather than an
+    array('H'), which would be smaller, because storing into a list is much faster in CPython. An array('H') works too
+    """
+    return [0] * MAX_MOVES
+
+
+def encode(origin: int, destination: int, promotion: Optional[PieceType]=None, flag: int=NORMAL) -> int:
+    """
+    :return: the 16 bit code of a move
+    """
+    kind = promotion.value if promotion is not None else (flag + 4 if flag else 0)
+    return origin | (destination << 6) | (kind << _KIND_SHIFT)
+
+
+def decode(code: int) -> Tuple[int, int, Optional[PieceType], int]:
+    """
+    :return: the move code as a tuple (origin, destination, promotion, flag)
+    """
+    kind = code >> _KIND_SHIFT
+    if kind > 4:
+        return code & 0x3f, (code >> 6) & 0x3f, None, kind - 4
+    return code & 0x3f, (code >> 6) & 0x3f, _PIECE_TYPES[kind] if kind else None, NORMAL
+
+
+def pinned_pieces(board: Board, to_move: Color) -> dict:
+    """
+    :return: maps the index of every piece of to_move that is pinned to its king, to the bitboard of the squares it
+    can move to without leaving the pin: the squares between the king and the pinning piece, and the pinning piece
+    """
+    pins = {}
+    king = board.king_squares[to_move.value]
+    if king < 0:
+        return pins
+    them = to_move.switch()
+    theirs = board.occupancy[them.value]
+    occupied = board.occupancy[0] | board.occupancy[1]
+    queens = board.bitboards[bitboard_index(PieceType.QUEEN, them)]
+    snipers = (rook_attacks(king, theirs) & (board.bitboards[bitboard_index(PieceType.ROOK, them)] | queens)) | \
+              (bishop_attacks(king, theirs) & (board.bitboards[bitboard_index(PieceType.BISHOP, them)] | queens))
+    ours = board.occupancy[to_move.value]
+    for sniper in iter_bits(snipers):
+        blockers = BETWEEN[king][sniper] & occupied
+        if blockers and not blockers & (blockers - 1) and blockers & ours:
+            pins[lsb(blockers)] = BETWEEN[king][sniper] | bit(sniper)
+    return pins
+
+
+def legal_moves(board: Board, to_move: Color, en_passant_file: str=None,
+                king_side: bool=False, queen_side: bool=False) -> List[Tuple[int, int, PieceType, int]]:
+    """
+    :return: every legal move of to_move, decoded, see generate_moves for the parameters
+    """
+    buffer = new_move_buffer()
+    count = generate_moves(board, to_move, buffer, en_passant_file, king_side, queen_side)
+    return [decode(buffer[i]) for i in range(count)]
+
+
+def generate_moves(board: Board, to_move: Color, buffer: List[int], en_passant_file: str=None,
+                   king_side: bool=False, queen_side: bool=False, stage: int=ALL_MOVES) -> int:
+    """
+    :param board: the position to generate moves in
+    :param to_move: the player whose moves are generated
+    :param buffer: where the move codes are written, from index 0, see new_move_buffer
+    :param en_passant_file: the file of a pawn that just advanced two squares, None if there is none
+    :param king_side: True if to_move still has the right to castle king side
+    :param queen_side: True if to_move still has the right to castle queen side
+    :param stage: ALL_MOVES, or CAPTURES or QUIETS for only those moves
+    :return: the number of legal moves of to_move. They are ordered by the square of the piece moved
+    """
+    us = to_move.value
+    them = to_move.switch()
+    bitboards = board.bitboards
+    ours = board.occupancy[us]
+    theirs = board.occupancy[them.value]
+    occupied = ours | theirs
+
+    king = board.king_squares[to_move.value]
+    king_bitboard = bit(king) if king >= 0 else 0
+    checkers = board.attackers_to(king, them, occupied) if king >= 0 else 0
+    double_check = checkers & (checkers - 1)
+    if checkers:
+        # Anything other than the king must capture the checking piece or block it
+        allowed = checkers | BETWEEN[king][lsb(checkers)]
+    else:
+        allowed = ALL_SQUARES ^ ours
+    pins = pinned_pieces(board, to_move)
+
+    pawns = bitboards[bitboard_index(PieceType.PAWN, to_move)]
+    knights = bitboards[bitboard_index(PieceType.KNIGHT, to_move)]
+    bishops = bitboards[bitboard_index(PieceType.BISHOP, to_move)]
+    rooks = bitboards[bitboard_index(PieceType.ROOK, to_move)]
+    forward = 8 if to_move is Color.WHITE else -8
+    start_rank = RANK_1 << 8 if to_move is Color.WHITE else RANK_8 >> 8
+    last_rank = RANK_8 if to_move is Color.WHITE else RANK_1
+
+    if stage == CAPTURES:
+        stage_targets, pawn_targets = theirs, theirs | last_rank
+    elif stage == QUIETS:
+        stage_targets = pawn_targets = ALL_SQUARES ^ occupied
+        pawn_targets &= ~last_rank
+    else:
+        stage_targets = pawn_targets = ALL_SQUARES
+
+    n = 0
+    for origin in iter_bits(ours):
+        mask = bit(origin)
+        if mask & king_bitboard:
+            without_king = occupied ^ king_bitboard
+            for target in iter_bits(KING_ATTACKS[origin] & ~ours & stage_targets):
+                if not board.attackers_to(target, them, without_king):
+                    buffer[n] = origin | (target << 6)
+                    n += 1
+            continue
+        if double_check:
+            continue
+
+        targets = allowed & pins.get(origin, ALL_SQUARES)
+        if mask & pawns:
+            destinations = PAWN_ATTACKS[us][origin] & theirs
+            target = origin + forward
+            if 0 <= target < 64 and not occupied & bit(target):
+                destinations |= bit(target)
+                if mask & start_rank and not occupied & bit(target + forward):
+                    destinations |= bit(target + forward)
+            for target in iter_bits(destinations & targets & pawn_targets):
+                if bit(target) & last_rank:
+                    for promotion in _PROMOTION_CODES:
+                        buffer[n] = origin | (target << 6) | promotion
+                        n += 1
+                else:
+                    buffer[n] = origin | (target << 6)
+                    n += 1
+            continue
+
+        if mask & knights:
+            destinations = KNIGHT_ATTACKS[origin]
+        elif mask & bishops:
+            destinations = bishop_attacks(origin, occupied)
+        elif mask & rooks:
+            destinations = rook_attacks(origin, occupied)
+        else:
+            destinations = queen_attacks(origin, occupied)
+        for target in iter_bits(destinations & targets & stage_targets):
+            buffer[n] = origin | (target << 6)
+            n += 1
+
+    if en_passant_file and not double_check and stage != QUIETS:
+        file = ord(en_passant_file) - ord('a')
+        destination = file + (40 if to_move is Color.WHITE else 16)
+        captured = destination - forward
+        if bitboards[bitboard_index(PieceType.PAWN, them)] & bit(captured) and not occupied & bit(destination):
+            for origin in iter_bits(PAWN_ATTACKS[them.value][destination] & pawns):
+                # The capture removes two pawns from the rank of the king's possible attackers, so the check is
+                # done on the position after the capture, rather than with the pins
+                after = occupied ^ bit(origin) ^ bit(captured) | bit(destination)
+                if king < 0 or not board.attackers_to(king, them, after) & ~bit(captured):
+                    buffer[n] = origin | (destination << 6) | EN_PASSANT_CODE
+                    n += 1
+
+    if not checkers and king == (4 if to_move is Color.WHITE else 60) and stage != CAPTURES:
+        rook_home = rooks & (bit(king + 3) | bit(king - 4))
+        if king_side and rook_home & bit(king + 3) and not occupied & (bit(king + 1) | bit(king + 2)) and \
+                not board.attackers_to(king + 1, them, occupied) and not board.attackers_to(king + 2, them, occupied):
+            buffer[n] = king | ((king + 2) << 6) | KING_SIDE_CASTLE_CODE
+            n += 1
+        if queen_side and rook_home & bit(king - 4) and \
+                not occupied & (bit(king - 1) | bit(king - 2) | bit(king - 3)) and \
+                not board.attackers_to(king - 1, them, occupied) and not board.attackers_to(king - 2, them, occupied):
+            buffer[n] = king | ((king - 2) << 6) | QUEEN_SIDE_CASTLE_CODE
+            n += 1
+    return n
+
+
+def has_legal_move(board: Board, to_move: Color, en_passant_file: str=None) -> bool:
+    """
+    :return: True if to_move has a legal move, see generate_moves for the parameters. It stops at the first one it
+    finds, trying the king first, and generates no move codes. Castling is not looked at: when it is legal, so is the
+    king's step towards the rook
+    """
+    us = to_move.value
+    them = to_move.switch()
+    bitboards = board.bitboards
+    ours = board.occupancy[us]
+    theirs = board.occupancy[them.value]
+    occupied = ours | theirs
+
+    king = board.king_squares[us]
+    checkers = 0
+    if king >= 0:
+        without_king = occupied ^ bit(king)
+        for target in iter_bits(KING_ATTACKS[king] & ~ours):
+            if not board.attackers_to(target, them, without_king):
+                return True
+        checkers = board.attackers_to(king, them, occupied)
+        if checkers & (checkers - 1):
+            return False
+    allowed = checkers | BETWEEN[king][lsb(checkers)] if checkers else ALL_SQUARES ^ ours
+    pins = pinned_pieces(board, to_move)
+
+    pawns = bitboards[bitboard_index(PieceType.PAWN, to_move)]
+    knights = bitboards[bitboard_index(PieceType.KNIGHT, to_move)]
+    bishops = bitboards[bitboard_index(PieceType.BISHOP, to_move)]
+    rooks = bitboards[bitboard_index(PieceType.ROOK, to_move)]
+    forward = 8 if to_move is Color.WHITE else -8
+    start_rank = RANK_1 << 8 if to_move is Color.WHITE else RANK_8 >> 8
+
+    for origin in iter_bits(ours & ~bit(king) if king >= 0 else ours):
+        mask = bit(origin)
+        if mask & pawns:
+            destinations = PAWN_ATTACKS[us][origin] & theirs
+            target = origin + forward
+            if 0 <= target < 64 and not occupied & bit(target):
+                destinations |= bit(target)
+                if mask & start_rank and not occupied & bit(target + forward):
+                    destinations |= bit(target + forward)
+        elif mask & knights:
+            destinations = KNIGHT_ATTACKS[origin]
+        elif mask & bishops:
+            destinations = bishop_attacks(origin, occupied)
+        elif mask & rooks:
+            destinations = rook_attacks(origin, occupied)
+        else:
+            destinations = queen_attacks(origin, occupied)
+        if destinations & allowed & pins.get(origin, ALL_SQUARES):
+            return True
+
+    if en_passant_file:
+        file = ord(en_passant_file) - ord('a')
+        destination = file + (40 if to_move is Color.WHITE else 16)
+        captured = destination - forward
+        if bitboards[bitboard_index(PieceType.PAWN, them)] & bit(captured) and not occupied & bit(destination):
+            for origin in iter_bits(PAWN_ATTACKS[them.value][destination] & pawns):
+                after = occupied ^ bit(origin) ^ bit(captured) | bit(destination)
+                if king < 0 or not board.attackers_to(king, them, after) & ~bit(captured):
+                    return True
+    return False
@@ -0,0 +1,202 @@
+"""
+Move ordering for alpha-beta search. A cutoff found on the first move spares searching the others, so the moves most
+likely to be best are tried first:
+    1. the move stored for the position in the transposition table
+    2. captures and promotions, most valuable victim first and then least valuable attacker first (MVV-LVA)
+    3. killer moves: quiet moves that caused a cutoff at the same ply in a sibling position
+    4. the other quiet moves, by their history score: how often, and how deep, they caused cutoffs anywhere
+
+The moves are generated in stages (see movegen.CAPTURES), so the quiet moves of a position are only generated once
+none of its captures caused a cutoff.
+"""
+from metaknight.board import Board, bitboard_index
+from metaknight.bitboard import bit
+from metaknight.game import Game
+from metaknight.move import Move, Castle
+from metaknight.movegen import new_move_buffer, CAPTURES, QUIETS, EN_PASSANT_CODE, KING_SIDE_CASTLE_CODE
+from metaknight.piece import PieceType
+from typing import Iterator, List, Optional
+
+KILLERS_PER_PLY = 2
+
+# The value of each piece type in centipawns for the static exchange evaluation, indexed by PieceType.value
+SEE_VALUES = [100, 320, 330, 500, 900, 20000]
+
+_KIND_SHIFT = 12
+_EN_PASSANT_KIND = EN_PASSANT_CODE >> _KIND_SHIFT
+_FIRST_CASTLE_KIND = KING_SIDE_CASTLE_CODE >> _KIND_SHIFT
+_PIECE_TYPES = tuple(PieceType)
+
+
+def mvv_lva(victim: Optional[PieceType], attacker: PieceType, promotion: Optional[PieceType]=None) -> int:
+    """
+    :param victim: the type of the piece captured, None if there is none
+    :param attacker: the type of the piece that moves
+    :param promotion: the type of piece a pawn promotes to, None if it doesn't
+    :return: how early the move should be tried among the captures, higher first
+    """
+    score = 8 * (victim.value + 1) - attacker.value if victim is not None else 0
+    if promotion is not None:
+        score += 8 * promotion.value
+    return score
+
+
+def capture_score(board: Board, code: int) -> int:
+    """
+    :param code: a move code for a position on board, see metaknight.movegen
+    :return: the MVV-LVA score of the move, see mvv_lva
+    """
+    origin = code & 0x3f
+    destination = (code >> 6) & 0x3f
+    kind = code >> _KIND_SHIFT
+    attacker = board.squares[origin >> 3][origin & 7].piece.piece_type
+    if kind == _EN_PASSANT_KIND:
+        return mvv_lva(PieceType.PAWN, attacker)
+    victim = board.squares[destination >> 3][destination & 7].piece
+    return mvv_lva(victim.piece_type if victim else None, attacker, _PIECE_TYPES[kind] if 0 < kind < 5 else None)
+
+
+def see(board: Board, code: int) -> int:
+    """
+    Static exchange evaluation: plays out every capture on the destination square of a move, each side capturing with
+    its least valuable piece and free to stop when going on would lose material. Pieces behind others on a line join
+    in as the pieces in front of them capture, but pins are not looked at
+    :param code: a move code for a position on board, see metaknight.movegen
+    :return: the material that the move wins for the player making it, in centipawns. Negative if it loses material
+    """
+    origin = code & 0x3f
+    destination = (code >> 6) & 0x3f
+    kind = code >> _KIND_SHIFT
+    piece = board.squares[origin >> 3][origin & 7].piece
+    occupied = (board.occupancy[0] | board.occupancy[1]) ^ bit(origin)
+
+    if kind == _EN_PASSANT_KIND:
+        gain = SEE_VALUES[PieceType.PAWN.value]
+        occupied ^= bit(destination + (-8 if piece.color.value == 0 else 8))
+    else:
+        victim = board.squares[destination >> 3][destination & 7].piece
+        gain = SEE_VALUES[victim.piece_type.value] if victim else 0
+    on_square = SEE_VALUES[piece.piece_type.value]
+    if 0 < kind < 5:
+        gain += SEE_VALUES[kind] - SEE_VALUES[PieceType.PAWN.value]
+        on_square = SEE_VALUES[kind]
+
+    gains = [gain]
+    color = piece.color.switch()
+    bitboards = board.bitboards
+    while True:
+        attackers = board.attackers_to(destination, color, occupied) & occupied
+        if not attackers:
+            break
+        for piece_type in _PIECE_TYPES:
+            least_valuable = bitboards[bitboard_index(piece_type, color)] & attackers
+            if least_valuable:
+                break
+        if piece_type is PieceType.KING and \
+                board.attackers_to(destination, color.switch(), occupied) & occupied:
+            # The king can't capture a defended piece
+            break
+        # What the side capturing now has won, if the other side stops here
+        gains.append(on_square - gains[-1])
+        occupied ^= least_valuable & -least_valuable
+        on_square = SEE_VALUES[piece_type.value]
+        color = color.switch()
+
+    # Either side may stop capturing when going on would lose material
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+def is_quiet(board: Board, code: int) -> bool:
+    """
+    :return: True if the move of code is neither a capture nor a promotion
+    """
+    kind = code >> _KIND_SHIFT
+    return (kind == 0 or kind >= _FIRST_CASTLE_KIND) and \
+        not (board.occupancy[0] | board.occupancy[1]) >> ((code >> 6) & 0x3f) & 1
+
+
+def order_moves(moves: List[Move or Castle]) -> List[Move or Castle]:
+    """
+    :param moves: moves such as the ones from Game.generate_moves
+    :return: the moves sorted by their MVV-LVA score, captures and promotions first
+    """
+    def score(move: Move or Castle) -> int:
+        victim = move.piece_captured.piece_type if move.piece_captured else None
+        promotion = move.promotion if isinstance(move, Move) and move.promote else None
+        return mvv_lva(victim, move.piece_moved.piece_type, promotion)
+
+    return sorted(moves, key=score, reverse=True)
+
+
+class MoveOrderer:
+    def __init__(self, max_ply: int=64):
+        """
+        :param max_ply: the deepest ply that moves will be ordered at
+        """
+        self.killers: List[List[int]] = [[0] * KILLERS_PER_PLY for _ in range(max_ply + 1)]
+        # The history scores of each color, indexed by the origin and destination of a move: code & 0xfff
+        self.history: List[List[int]] = [[0] * 4096, [0] * 4096]
+        self._buffers = [new_move_buffer() for _ in range(max_ply + 1)]
+
+    def new_search(self):
+        """
+        Forgets the killer moves and halves the history scores, so that they follow the current position
+        """
+        for killers in self.killers:
+            killers[:] = [0] * KILLERS_PER_PLY
+        for scores in self.history:
+            scores[:] = [score >> 1 for score in scores]
+
+    def moves(self, game: Game, ply: int, hash_move: int=0) -> Iterator[int]:
+        """
+        Yields the codes of the legal moves of game in the order they should be searched, see the module docstring.
+        The game must be back in its current position whenever the next move is asked for
+        :param ply: the distance from the root of the search, which killer moves belong to
+        :param hash_move: the code of the move stored for the position in the transposition table, 0 for none
+        """
+        board = game.board
+        buffer = self._buffers[ply]
+        count = game.generate_move_codes(buffer, stage=CAPTURES)
+        captures = buffer[:count]
+        captures.sort(key=lambda code: capture_score(board, code), reverse=True)
+        quiets = None
+        if hash_move:
+            if hash_move in captures:
+                captures.remove(hash_move)
+                yield hash_move
+            else:
+                # A code from the table may not be legal here, so it is looked for among the quiet moves
+                quiets = self._quiet_moves(game, ply)
+                if hash_move in quiets:
+                    quiets.remove(hash_move)
+                    yield hash_move
+        yield from captures
+
+        if quiets is None:
+            quiets = self._quiet_moves(game, ply)
+        for killer in self.killers[ply]:
+            if killer in quiets:
+                quiets.remove(killer)
+                yield killer
+        history = self.history[game.to_move.value]
+        quiets.sort(key=lambda code: history[code & 0xfff], reverse=True)
+        yield from quiets
+
+    def _quiet_moves(self, game: Game, ply: int) -> List[int]:
+        buffer = self._buffers[ply]
+        return buffer[:game.generate_move_codes(buffer, stage=QUIETS)]
+
+    def record_cutoff(self, game: Game, code: int, ply: int, depth: int):
+        """
+        Call this when a move caused a beta cutoff, with the game back in the position the move was played from
+        :param depth: the depth that was left to search, deeper cutoffs count for more
+        """
+        if not is_quiet(game.board, code):
+            return
+        killers = self.killers[ply]
+        if killers[0] != code:
+            killers[1:] = killers[:-1]
+            killers[0] = code
+        self.history[game.to_move.value][code & 0xfff] += depth * depth
@@ -0,0 +1,250 @@
+"""
+Splits work at the root across a pool of processes: each legal move of the current position becomes one task.
+
+lazy_smp_search works differently: every worker searches the whole position, and they share a transposition table.
+
+Workers are sent positions packed into their FEN (see pack_game) rather than pickled Game objects, which drag their
+whole history along, and send back plain counts, move names and scores. Results are merged in the order that
+Game.generate_moves returns the root moves, so they do not depend on which worker finishes first.
+"""
+from metaknight.game import Game
+from metaknight.move import Move, Castle
+from metaknight.perft import perft, move_name
+from metaknight.search import Search, SearchResult, MATE, MAX_DEPTH, is_mate_score
+from metaknight.transposition import TranspositionTable, TWO_TIER
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+import sys
+from typing import Dict, List, Optional, Tuple
+from time import perf_counter
+
+# A packed position is its FEN, see Game.to_fen
+PackedGame = str
+
+
+def pack_game(game: Game) -> PackedGame:
+    return game.to_fen()
+
+
+def unpack_game(packed: PackedGame) -> Game:
+    return Game.from_fen(packed)
+
+
+def find_move(game: Game, name: str) -> Move or Castle:
+    """
+    :param name: a move name, see metaknight.perft.move_name
+    :return: the legal move of game with that name
+    """
+    for move in game.generate_moves():
+        if move_name(move) == name:
+            return move
+    raise ValueError(f'{name} is not a legal move')
+
+
+def _children(game: Game) -> List[Tuple[str, PackedGame]]:
+    """
+    :return: the name of every legal move of game, with the packed position it leads to
+    """
+    children = []
+    for move in game.generate_moves():
+        game.play_move(m=move)
+        children.append((move_name(move), pack_game(game)))
+        game.undo_move()
+    return children
+
+
+def _perft_task(packed: PackedGame, depth: int) -> int:
+    return perft(unpack_game(packed), depth)
+
+
+def _lines_task(packed: PackedGame, depth: int) -> List[List[str]]:
+    return [[move_name(move) for move in line] for line in unpack_game(packed).iter_possible_games(depth)]
+
+
+def _check_depth(depth: int):
+    if depth < 1:
+        raise ValueError(f'The depth must be at least 1, not {depth}')
+
+
+# Each worker process keeps one transposition table for all the root moves it searches
+_worker_table: Optional[TranspositionTable] = None
+
+
+def _search_task(packed: PackedGame, depth: int, table_mb: float,
+                 node_limit: Optional[int]) -> Tuple[int, List[str], int]:
+    """
+    :return: the score of the packed position for its player to move, its principal variation and the nodes searched
+    """
+    global _worker_table
+    if _worker_table is None:
+        _worker_table = TranspositionTable(table_mb)
+    game = unpack_game(packed)
+    if not game.count_moves():
+        return (-MATE if game.board.in_check(game.to_move) else 0), [], 1
+    search = Search(game, table=_worker_table, node_limit=node_limit)
+    if depth <= 0:
+        return search.quiescence(), [], search.nodes
+    result = search.search(depth)
+    return result.score, [move_name(move) for move in result.pv], result.nodes
+
+
+def parallel_divide(game: Game, depth: int, workers: int=None) -> Dict[str, int]:
+    """
+    :return: the perft count below each root move, as metaknight.perft.divide, counted by a pool of workers processes
+    """
+    _check_depth(depth)
+    children = _children(game)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        counts = executor.map(_perft_task, [packed for name, packed in children], [depth - 1] * len(children))
+        return {name: count for (name, packed), count in zip(children, counts)}
+
+
+def parallel_perft(game: Game, depth: int, workers: int=None) -> int:
+    """
+    :return: the number of move sequences of length depth from game, counted by a pool of workers processes
+    """
+    _check_depth(depth)
+    if depth == 1:
+        return perft(game, depth)
+    return sum(parallel_divide(game, depth, workers).values())
+
+
+def parallel_possible_games(game: Game, n: int, workers: int=None) -> List[List[str]]:
+    """
+    :return: every line of n moves from game, as Game.possible_games, with each move given by its move name
+    """
+    if n <= 0:
+        return [[]]
+    children = _children(game)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        lines = executor.map(_lines_task, [packed for name, packed in children], [n - 1] * len(children))
+        return [[name] + line for (name, packed), child_lines in zip(children, lines) for line in child_lines]
+
+
+def parallel_search(game: Game, depth: int, workers: int=None, table_mb: float=16,
+                    node_limit: int=None) -> SearchResult:
+    """
+    Searches every root move of game to depth - 1 in a pool of worker processes, and picks the best.
+    Ties go to the move that Game.generate_moves lists first
+    :param table_mb: the size of the transposition table of each worker
+    :param node_limit: the node limit of the search of each root move
+    """
+    _check_depth(depth)
+    start = perf_counter()
+    children = _children(game)
+    if not children:
+        return SearchResult(None, -MATE if game.board.in_check(game.to_move) else 0, [], depth, 0, 0.0)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_search_task, [packed for name, packed in children], [depth - 1] * len(children),
+                                    [table_mb] * len(children), [node_limit] * len(children)))
+
+    best_score = None
+    best_line = []
+    nodes = len(children)
+    for (name, packed), (score, pv, child_nodes) in zip(children, results):
+        nodes += child_nodes
+        score = -score
+        if is_mate_score(score):
+            score -= 1 if score > 0 else -1  # The root move is one more ply before the mate
+        if best_score is None or score > best_score:
+            best_score = score
+            best_line = [name] + pv
+
+    pv = []
+    for name in best_line:
+        move = find_move(game, name)
+        pv.append(move)
+        game.play_move(m=move)
+    for _ in pv:
+        game.undo_move()
+    return SearchResult(pv[0], best_score, pv, depth, nodes, perf_counter() - start)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Opens the shared memory block created by the main process, which alone is responsible for unlinking it
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Python < 3.13 registers the block with the resource tracker. Workers started by multiprocessing, forked or
+    # spawned, share the tracker of the main process, where the block must stay registered until the main process
+    # unlinks it. Only a tracker this worker starts for itself would unlink the block when the worker exits
+    own_tracker = getattr(resource_tracker._resource_tracker, '_fd', None) is None
+    memory = shared_memory.SharedMemory(name=name)
+    if own_tracker:
+        resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
+
+
+def skip_pattern(worker: int) -> Tuple[int, int]:
+    """
+    :return: the skip size and phase of a lazy SMP worker, see Search.search. Worker 0 searches every depth. The
+    other workers get a pattern each, however many there are: the next 2 skip every other depth, the next 4 skip two
+    depths out of four, the next 6 three out of six and so on
+    """
+    if worker == 0:
+        return 0, 0
+    phase = worker - 1
+    size = 1
+    while phase >= 2 * size:
+        phase -= 2 * size
+        size += 1
+    return size, phase
+
+
+def _lazy_smp_task(memory_name: str, table_mb: float, replacement: str, packed: PackedGame, worker: int,
+                   time_limit: float, max_depth: int) -> Tuple[int, int, List[str], int]:
+    """
+    :return: the depth completed, the score, the principal variation and the number of nodes searched
+    """
+    memory = _attach(memory_name)
+    table = TranspositionTable(table_mb, replacement, buffer=memory.buf)
+    try:
+        game = unpack_game(packed)
+        # Each worker skips its own pattern of depths, so that the workers search different depths at once and fill the
+        # table with results that the others can use
+        skip_size, skip_phase = skip_pattern(worker)
+        search = Search(game, table=table, time_limit=time_limit)
+        result = search.search(max_depth, skip_size=skip_size, skip_phase=skip_phase)
+        return result.depth, result.score, [move_name(move) for move in result.pv], result.nodes
+    finally:
+        table.close()
+        memory.close()
+
+
+def lazy_smp_search(game: Game, time_limit: float, workers: int=4, table_mb: float=64,
+                    replacement: str=TWO_TIER, max_depth: int=MAX_DEPTH) -> SearchResult:
+    """
+    Lazy SMP: workers processes search the same position at staggered depths (see skip_pattern) until time_limit,
+    sharing one transposition table held in shared memory. The entries are lockless: a torn write fails the key check
+    (see metaknight.transposition). The result of the worker that completed the deepest iteration is returned, ties
+    going to the lowest numbered worker
+    :param table_mb: the size of the shared transposition table
+    """
+    start = perf_counter()
+    memory = shared_memory.SharedMemory(create=True, size=TranspositionTable.bytes_needed(table_mb))
+    try:
+        memory.buf[:len(memory.buf)] = bytes(len(memory.buf))
+        packed = pack_game(game)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_lazy_smp_task, memory.name, table_mb, replacement, packed, worker,
+                                       time_limit, max_depth) for worker in range(workers)]
+            results = [future.result() for future in futures]
+    finally:
+        memory.close()
+        memory.unlink()
+
+    depth, score, names, nodes = results[0]
+    for result in results[1:]:
+        if result[0] > depth:
+            depth, score, names = result[:3]
+    pv = []
+    for name in names:
+        move = find_move(game, name)
+        pv.append(move)
+        game.play_move(m=move)
+    for _ in pv:
+        game.undo_move()
+    return SearchResult(pv[0] if pv else None, score, pv, depth, sum(result[3] for result in results),
+                        perf_counter() - start)
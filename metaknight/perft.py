@@ -0,0 +1,209 @@
+"""
+Perft: counts the leaf nodes of the move tree to a fixed depth. The counts of well known positions are published, so
+perft checks the move generator, and it measures how fast moves are generated and played.
+
+Run it from the command line with
+    python -m metaknight.perft 4
+    python -m metaknight.perft 3 --divide --position kiwipete
+    python -m metaknight.perft --suite
+"""
+from metaknight.game import Game
+from metaknight.move import Move, Castle
+from metaknight.movegen import new_move_buffer
+from typing import Dict, List, NamedTuple, Optional
+from time import perf_counter
+import argparse
+import sys
+
+
+class PerftResult(NamedTuple):
+    nodes: int
+    time: float  # in seconds
+    generation_time: float  # the part of time spent generating moves, if it was measured
+    make_unmake_time: float  # the part of time spent playing and undoing moves, if it was measured
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.time if self.time else 0.0
+
+
+class ReferencePosition(NamedTuple):
+    name: str
+    fen: str
+    counts: List[int]  # counts[i] is the number of leaf nodes at depth i + 1
+
+
+# The standard perft positions, see https://www.chessprogramming.org/Perft_Results
+REFERENCE_POSITIONS = [
+    ReferencePosition('initial', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                      [20, 400, 8902, 197281, 4865609]),
+    ReferencePosition('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                      [48, 2039, 97862, 4085603]),
+    ReferencePosition('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                      [14, 191, 2812, 43238, 674624]),
+    ReferencePosition('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                      [6, 264, 9467, 422333]),
+    ReferencePosition('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                      [44, 1486, 62379, 2103487]),
+]
+
+
+def load_position(position: ReferencePosition) -> Game:
+    """
+    :return: a new game set up at position
+    """
+    return Game.from_fen(position.fen)
+
+
+def perft(game: Game, depth: int) -> int:
+    """
+    :return: the number of move sequences of length depth from the current position of game
+    """
+    return _perft(game, depth, [new_move_buffer() for _ in range(max(depth, 0))])
+
+
+def _perft(game: Game, depth: int, buffers: list) -> int:
+    # buffers[depth - 1] holds the move codes of the current position, they are only made into moves to be played
+    if depth <= 0:
+        return 1
+    moves = buffers[depth - 1]
+    count = game.generate_move_codes(moves)
+    if depth == 1:
+        return count
+    nodes = 0
+    for i in range(count):
+        game.play_move(m=game.decode_move(moves[i]))
+        nodes += _perft(game, depth - 1, buffers)
+        game.undo_move()
+    return nodes
+
+
+def timed_perft(game: Game, depth: int, phases: bool=False) -> PerftResult:
+    """
+    :param phases: if True, also measures the time spent generating moves and playing and undoing them. The
+    measurements slow the count down
+    """
+    start = perf_counter()
+    if not phases:
+        nodes = perft(game, depth)
+        return PerftResult(nodes, perf_counter() - start, 0.0, 0.0)
+    times = [0.0, 0.0]
+    nodes = _phased_perft(game, depth, times, [new_move_buffer() for _ in range(max(depth, 0))])
+    return PerftResult(nodes, perf_counter() - start, times[0], times[1])
+
+
+def _phased_perft(game: Game, depth: int, times: List[float], buffers: list) -> int:
+    if depth <= 0:
+        return 1
+    start = perf_counter()
+    moves = buffers[depth - 1]
+    count = game.generate_move_codes(moves)
+    times[0] += perf_counter() - start
+    if depth == 1:
+        return count
+    nodes = 0
+    for i in range(count):
+        start = perf_counter()
+        game.play_move(m=game.decode_move(moves[i]))
+        times[1] += perf_counter() - start
+        nodes += _phased_perft(game, depth - 1, times, buffers)
+        start = perf_counter()
+        game.undo_move()
+        times[1] += perf_counter() - start
+    return nodes
+
+
+def move_name(move: Move or Castle) -> str:
+    """
+    :return: the move as its origin and destination, followed by the promotion piece if there is one. For example
+    e2e4, e1g1 or a7a8q
+    """
+    name = f'{move.origin}{move.destination}'
+    if isinstance(move, Move) and move.promote:
+        name += repr(move.promotion).lower()
+    return name
+
+
+def divide(game: Game, depth: int) -> Dict[str, int]:
+    """
+    :param depth: the depth counted to, at least 1 so that there are root moves to divide by
+    :return: the perft count below each legal move, keyed by move_name
+    """
+    if depth < 1:
+        raise ValueError(f'divide needs a depth of at least 1, not {depth}')
+    counts = {}
+    for move in game.generate_moves():
+        game.play_move(m=move)
+        counts[move_name(move)] = perft(game, depth - 1)
+        game.undo_move()
+    return counts
+
+
+def run_suite(max_nodes: int=1000000, positions: List[ReferencePosition]=None, out=sys.stdout) -> bool:
+    """
+    Runs perft on each reference position, at every depth whose expected count is at most max_nodes
+    :return: True if every count matched
+    """
+    passed = True
+    for position in positions or REFERENCE_POSITIONS:
+        game = load_position(position)
+        for depth, expected in enumerate(position.counts, 1):
+            if expected > max_nodes:
+                break
+            result = timed_perft(game, depth)
+            status = 'ok' if result.nodes == expected else f'FAILED, expected {expected}'
+            passed = passed and result.nodes == expected
+            print(f'{position.name:12} depth {depth}: {result.nodes:>9} nodes {result.time:8.3f}s '
+                  f'{result.nodes_per_second:10.0f} nodes/s  {status}', file=out)
+    return passed
+
+
+def _position(name: str) -> Optional[ReferencePosition]:
+    for position in REFERENCE_POSITIONS:
+        if position.name == name:
+            return position
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m metaknight.perft', description='Count the move tree to a depth')
+    parser.add_argument('depth', type=int, nargs='?', default=3)
+    parser.add_argument('--position', default='initial',
+                        help='one of: ' + ', '.join(position.name for position in REFERENCE_POSITIONS))
+    parser.add_argument('--divide', action='store_true', help='print the count below each root move')
+    parser.add_argument('--phases', action='store_true', help='time move generation and make/unmake separately')
+    parser.add_argument('--suite', action='store_true', help='check every reference position')
+    parser.add_argument('--max-nodes', type=int, default=1000000, help='the largest count the suite checks')
+    args = parser.parse_args(argv)
+    if args.depth < 1:
+        parser.error(f'depth must be at least 1, not {args.depth}')
+
+    if args.suite:
+        return 0 if run_suite(args.max_nodes) else 1
+
+    position = _position(args.position)
+    if position is None:
+        parser.error(f'unknown position {args.position}')
+    game = load_position(position)
+
+    if args.divide:
+        start = perf_counter()
+        counts = divide(game, args.depth)
+        for name, count in counts.items():
+            print(f'{name}: {count}')
+        nodes = sum(counts.values())
+        elapsed = perf_counter() - start
+    else:
+        result = timed_perft(game, args.depth, phases=args.phases)
+        nodes, elapsed = result.nodes, result.time
+        if args.phases:
+            print(f'generation: {result.generation_time:.3f}s  make/unmake: {result.make_unmake_time:.3f}s')
+    print(f'nodes: {nodes}  time: {elapsed:.3f}s  nodes/s: {nodes / elapsed if elapsed else 0:.0f}')
+
+    if 1 <= args.depth <= len(position.counts) and nodes != position.counts[args.depth - 1]:
+        print(f'expected {position.counts[args.depth - 1]}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
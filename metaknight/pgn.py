@@ -0,0 +1,140 @@
+"""
+A streaming PGN reader. Games are read one at a time, so a file of any size is read in constant memory, and files
+compressed with gzip are read as they are decompressed.
+
+    for pgn in read_games('games.pgn.gz'):
+        game = replay(pgn, trust=True)
+
+With trust=True, moves are taken from a database that is known to be good: each SAN move is resolved with the attack
+tables, and its legality is not checked (see Game.notation_parser), so replaying is much faster. An illegal move then
+leaves the game in a position that makes no sense, rather than raising InvalidNotationError.
+"""
+from metaknight.game import Game
+from typing import Dict, Iterator, List, NamedTuple, TextIO, Union
+import gzip
+import os
+import re
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+class PgnGame(NamedTuple):
+    headers: Dict[str, str]
+    moves: List[str]  # in SAN, with check marks but without annotations such as ! and ?
+    result: str  # one of RESULTS
+
+
+class Position(NamedTuple):
+    ply: int  # the number of moves played before the position
+    fen: str
+    move: str  # the move played from the position in SAN, '' for the last position of a game
+
+
+_HEADER = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_TOKEN = re.compile(r'[{}();]|[^\s{}();]+')
+_MOVE_NUMBER = re.compile(r'\d+\.+')
+
+
+def open_pgn(path: Union[str, os.PathLike]) -> TextIO:
+    """
+    :return: the file at path opened for reading as text, decompressing it if it is gzipped
+    """
+    with open(path, 'rb') as file:
+        compressed = file.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def read_games(source: Union[str, os.PathLike, TextIO]) -> Iterator[PgnGame]:
+    """
+    :param source: the path of a PGN file, which may be gzipped, or a PGN file opened as text
+    :return: the games of source, read lazily. Variations, comments and numeric annotations are skipped
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open_pgn(source) as file:
+            yield from _read_games(file)
+    else:
+        yield from _read_games(source)
+
+
+def _read_games(lines: Iterator[str]) -> Iterator[PgnGame]:
+    headers = {}
+    moves = []
+    in_comment = False
+    variation_depth = 0
+    for line in lines:
+        if not in_comment:
+            if line.startswith('%'):
+                continue
+            if line.startswith('['):
+                if moves:
+                    # The previous game had no result
+                    yield PgnGame(headers, moves, headers.get('Result', '*'))
+                    headers, moves, variation_depth = {}, [], 0
+                match = _HEADER.match(line)
+                if match:
+                    headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+                continue
+
+        for token in _TOKEN.findall(line):
+            if in_comment:
+                in_comment = token != '}'
+            elif token == '{':
+                in_comment = True
+            elif token == ';':
+                break
+            elif token == '(':
+                variation_depth += 1
+            elif token == ')':
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth or token[0] == '$':
+                continue
+            elif token in RESULTS:
+                yield PgnGame(headers, moves, token)
+                headers, moves = {}, []
+            else:
+                token = _MOVE_NUMBER.sub('', token, count=1).rstrip('!?')
+                if token:
+                    moves.append(token)
+    if headers or moves:
+        yield PgnGame(headers, moves, headers.get('Result', '*'))
+
+
+def new_game(pgn: PgnGame) -> Game:
+    """
+    :return: a game at the starting position of pgn, which is given by its FEN header if it has one
+    """
+    fen = pgn.headers.get('FEN')
+    return Game.from_fen(fen) if fen else Game()
+
+
+def replay(pgn: PgnGame, trust: bool=False) -> Game:
+    """
+    :param trust: True to skip checking that the moves are legal, see the module docstring
+    :return: a game with every move of pgn played
+    """
+    game = new_game(pgn)
+    for san in pgn.moves:
+        play_san(game, san, trust)
+    return game
+
+
+def positions(pgn: PgnGame, trust: bool=False) -> Iterator[Position]:
+    """
+    Replays pgn, yielding every position it goes through, from the starting position to the last one
+    :param trust: True to skip checking that the moves are legal, see the module docstring
+    """
+    game = new_game(pgn)
+    for ply, san in enumerate(pgn.moves):
+        yield Position(ply, game.to_fen(), san)
+        play_san(game, san, trust)
+    yield Position(len(pgn.moves), game.to_fen(), '')
+
+
+def play_san(game: Game, san: str, trust: bool=False):
+    """
+    Plays a move given in SAN, such as 'Nbd7', 'exd8=Q+' or 'O-O'
+    :param trust: True to skip checking that the move is legal, see the module docstring
+    """
+    game.play_move(m=game.notation_parser(san, validate=not trust))
@@ -26,9 +26,17 @@ class Color(Enum):
 
 
 class Piece:
-    def __init__(self, piece_type: PieceType, color: Color):
-        self.piece_type = piece_type
-        self.color = color
+    """
+    Pieces are interned: Piece(PieceType.KING, Color.WHITE) always returns the same object, so pieces are compared by
+    identity
+    """
+    __slots__ = ('piece_type', 'color')
+
+    def __new__(cls, piece_type: PieceType, color: Color):
+        return _PIECES[6 * color.value + piece_type.value]
+
+    def __reduce__(self):
+        return Piece, (self.piece_type, self.color)
 
     def __repr__(self):
         if self.color is Color.BLACK:
@@ -58,7 +66,13 @@ class Piece:
             if self.piece_type is PieceType.KING:
                 return '\u265a'
 
-    def __eq__(self, other):
-        return isinstance(other, Piece) and \
-               other.piece_type == self.piece_type and \
-               other.color == self.color
+
+def _create_piece(piece_type: PieceType, color: Color) -> Piece:
+    piece = object.__new__(Piece)
+    piece.piece_type = piece_type
+    piece.color = color
+    return piece
+
+
+# Indexed like the bitboards of a Board: 6 * color + piece type
+_PIECES = [_create_piece(piece_type, color) for color in Color for piece_type in PieceType]
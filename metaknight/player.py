@@ -10,3 +10,16 @@ class WorstPlayer:
         moves = self.game.generate_moves()
         index = randint(0, len(moves) - 1)
         return moves[index]
+
+
+class SearchPlayer:
+    def __init__(self, game: Game, time_limit: float=1.0):
+        """
+        :param time_limit: the number of seconds to think about each move
+        """
+        self.game = game
+        self.time_limit = time_limit
+
+    def make_move(self) -> Move:
+        from metaknight.search import best_move
+        return best_move(self.game, time_limit=self.time_limit).best_move
@@ -0,0 +1,271 @@
+"""
+Alpha-beta search. Scores are in centipawns from the point of view of the player to move, see Board.evaluate
+
+At the end of the depth searched, a quiescence search plays on the captures and promotions until the position is
+quiet, so that a position in the middle of an exchange is not scored as if the exchange were over
+"""
+from metaknight.game import Game
+from metaknight.move import Move, Castle
+from metaknight.movegen import new_move_buffer, CAPTURES
+from metaknight.ordering import MoveOrderer, capture_score, see, SEE_VALUES
+from metaknight.piece import Color, PieceType
+from metaknight.transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from typing import List, NamedTuple, Optional
+from time import perf_counter
+
+INFINITY = 1000000
+MATE = 100000  # The score of being checkmated right now. Being mated in n plies scores -(MATE - n)
+MAX_DEPTH = 64
+
+# How many nodes are searched between two looks at the clock
+_CHECK_INTERVAL = 1024
+
+# In the quiescence search, a capture is skipped if winning the piece captured and this much more would still not
+# raise alpha (delta pruning)
+DELTA_MARGIN = 200
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time or node limit is reached, to unwind it
+    """
+    pass
+
+
+class SearchResult(NamedTuple):
+    best_move: Optional[Move or Castle]  # None if the player to move has no legal move
+    score: int
+    pv: List[Move or Castle]  # The principal variation: the line both players are expected to play
+    depth: int  # The depth of the last iteration that completed
+    nodes: int
+    time: float  # in seconds
+
+
+def is_mate_score(score: int) -> bool:
+    return abs(score) >= MATE - MAX_DEPTH
+
+
+class Search:
+    def __init__(self, game: Game, table: TranspositionTable=None, time_limit: float=None, node_limit: int=None):
+        """
+        :param game: the game to search, it is left as it was when the search ends
+        :param table: the transposition table to use, one is created if None is given
+        :param time_limit: stop searching after this many seconds, None for no limit
+        :param node_limit: stop searching after this many positions, None for no limit
+        """
+        self.game = game
+        self.table = table if table is not None else TranspositionTable()
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+
+        self.nodes = 0
+        self._start = 0.0
+        self._can_stop = False
+        self._pv: List[List[Move or Castle]] = [[] for _ in range(MAX_DEPTH + 1)]
+        self.orderer = MoveOrderer(MAX_DEPTH)
+        self._captures = [new_move_buffer() for _ in range(MAX_DEPTH + 1)]  # The captures generated at each ply
+
+    def search(self, max_depth: int=MAX_DEPTH, start_depth: int=1, skip_size: int=0,
+               skip_phase: int=0) -> SearchResult:
+        """
+        Searches deeper and deeper until max_depth is reached or a limit runs out
+        :param start_depth: the depth of the first iteration
+        :param skip_size: 0 to search every depth. Otherwise, once an iteration has completed, depths are searched
+        skip_size at a time and then skip_size are skipped, which lets searches sharing a table go different ways
+        :param skip_phase: shifts the depths that are skipped, from 0 to 2 * skip_size - 1
+        :return: the result of the deepest search that completed. The first iteration always completes
+        """
+        self.nodes = 0
+        self._start = perf_counter()
+        self.table.new_search()
+        self.orderer.new_search()
+        result = SearchResult(None, 0, [], 0, 0, 0.0)
+
+        last_depth = min(max_depth, MAX_DEPTH)
+        for depth in range(max(start_depth, 1), last_depth + 1):
+            if result.depth and skip_size and depth < last_depth and (depth + skip_phase) // skip_size % 2:
+                continue
+            self._can_stop = result.depth > 0
+            try:
+                score = self._negamax(depth, -INFINITY, INFINITY, 0)
+            except SearchTimeout:
+                break
+            pv = list(self._pv[0])
+            result = SearchResult(pv[0] if pv else None, score, pv, depth, self.nodes, perf_counter() - self._start)
+            if not pv or is_mate_score(score):
+                break
+        return result._replace(nodes=self.nodes, time=perf_counter() - self._start)
+
+    def quiescence(self) -> int:
+        """
+        :return: the score of the current position for the player to move, once the captures and promotions that
+        follow it are played out. This is how the search scores the positions at the end of the depth searched
+        """
+        self.nodes = 0
+        self._start = perf_counter()
+        self._can_stop = False
+        return self._quiescence(-INFINITY, INFINITY, 0)
+
+    def evaluate(self) -> int:
+        """
+        :return: the static score of the current position for the player to move
+        """
+        score = self.game.board.evaluate_centipawns()
+        return score if self.game.to_move is Color.WHITE else -score
+
+    def _check_limits(self):
+        if not self._can_stop:
+            return
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout
+        if self.time_limit is not None and self.nodes % _CHECK_INTERVAL == 0 and \
+                perf_counter() - self._start >= self.time_limit:
+            raise SearchTimeout
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        game = self.game
+        if ply > 0 and (game.repetitions() > 1 or game.is_draw_by_fifty_move_rule()):
+            # A position that repeats can be repeated again, so it is scored as the draw it leads to
+            self.nodes += 1
+            self._pv[ply] = []
+            return 0
+        if depth <= 0:
+            return self._quiescence(alpha, beta, ply)
+        self.nodes += 1
+        self._check_limits()
+        self._pv[ply] = []
+
+        key = game.zobrist_key
+        entry = self.table.probe(key)
+        hash_move = 0
+        if entry:
+            hash_move = entry.move
+            if ply > 0 and entry.depth >= depth:
+                score = _score_from_table(entry.score, ply)
+                if entry.bound == EXACT or \
+                        (entry.bound == LOWER_BOUND and score >= beta) or \
+                        (entry.bound == UPPER_BOUND and score <= alpha):
+                    return score
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        for code in self.orderer.moves(game, ply, hash_move):
+            move = game.decode_move(code)
+            game.play_move(m=move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.undo_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = code
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if alpha >= beta:
+                        self.orderer.record_cutoff(game, code, ply, depth)
+                        break
+
+        if not best_move:
+            return -(MATE - ply) if game.board.in_check(game.to_move) else 0
+        if best_score <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.table.store(key, depth, bound, _score_to_table(best_score, ply), best_move)
+        return best_score
+
+    def _quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        self._check_limits()
+        self._pv[ply] = []
+        game = self.game
+        board = game.board
+        if ply >= MAX_DEPTH:
+            return self.evaluate()
+        if board.in_check(game.to_move):
+            return self._evasions(alpha, beta, ply)
+
+        # The player to move doesn't have to capture, so the static score is a lower bound: standing pat
+        best_score = self.evaluate()
+        if best_score >= beta:
+            return best_score
+        alpha = max(alpha, best_score)
+
+        captures = self._captures[ply]
+        count = game.generate_move_codes(captures, stage=CAPTURES)
+        moves = captures[:count]
+        moves.sort(key=lambda code: capture_score(board, code), reverse=True)
+        for code in moves:
+            destination = (code >> 6) & 0x3f
+            victim = board.squares[destination >> 3][destination & 7].piece
+            promotion = 0 < code >> 12 < 5
+            if not promotion and best_score + (SEE_VALUES[victim.piece_type.value] if victim else
+                                               SEE_VALUES[PieceType.PAWN.value]) + DELTA_MARGIN <= alpha:
+                continue
+            if see(board, code) < 0:
+                continue
+            move = game.decode_move(code)
+            game.play_move(m=move)
+            try:
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game.undo_move()
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _evasions(self, alpha: int, beta: int, ply: int) -> int:
+        # In check, standing pat is not an option: every move out of check is searched, so that mates are found
+        game = self.game
+        best_score = -INFINITY
+        for code in self.orderer.moves(game, ply):
+            move = game.decode_move(code)
+            game.play_move(m=move)
+            try:
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game.undo_move()
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if alpha >= beta:
+                        break
+        return best_score if best_score > -INFINITY else -(MATE - ply)
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    # Mate scores are stored relative to the position rather than to the root, so they are valid wherever it occurs
+    if score >= MATE - MAX_DEPTH:
+        return score + ply
+    if score <= -(MATE - MAX_DEPTH):
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    if score >= MATE - MAX_DEPTH:
+        return score - ply
+    if score <= -(MATE - MAX_DEPTH):
+        return score + ply
+    return score
+
+
+def best_move(game: Game, time_limit: float=None, max_depth: int=MAX_DEPTH, node_limit: int=None) -> SearchResult:
+    """
+    Runs an iterative deepening search of game with a fresh transposition table
+    """
+    return Search(game, time_limit=time_limit, node_limit=node_limit).search(max_depth)
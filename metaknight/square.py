@@ -1,39 +1,82 @@
 class Square:
+    """
+    Squares are interned: Square('e4') always returns the same object, and so does Square('00'), the square that is
+    off the board. A Board keeps its own squares, made with Square.unique, because they hold its pieces
+    """
+    __slots__ = ('file', 'rank', 'index', 'piece')
+
     files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
     ranks = ['1', '2', '3', '4', '5', '6', '7', '8']
 
-    def __init__(self, coordinates: str):
+    def __new__(cls, coordinates: str):
         # A Square will have coordinates '00' if it out of bounds (does not exist in the chess board
-        self.file = coordinates[0]
-        self.rank = coordinates[1]
-        self.piece = None
+        square = _INTERNED.get(coordinates)
+        if square is None:
+            square = cls.unique(coordinates)
+        return square
+
+    @classmethod
+    def unique(cls, coordinates: str) -> 'Square':
+        """
+        :return: a square that is not shared with anyone, so that a piece can be put on it
+        """
+        square = object.__new__(cls)
+        square.file = coordinates[0]
+        square.rank = coordinates[1]
+        square.index = INDICES.get(coordinates[:2], -1)  # position of this square on a bitboard, -1 if out of bounds
+        square.piece = None
+        return square
 
     def __repr__(self):
         return f'{self.file}{self.rank}'
 
     def __eq__(self, other):
-        return isinstance(other, Square) and other.file == self.file and other.rank == self.rank
+        return self is other or isinstance(other, Square) and other.index == self.index and \
+               other.file == self.file and other.rank == self.rank
+
+    def __hash__(self):
+        return self.index
+
+    def __reduce__(self):
+        if _INTERNED.get(f'{self.file}{self.rank}') is self:
+            return Square, (f'{self.file}{self.rank}',)
+        return _unpickle_unique, (f'{self.file}{self.rank}', self.piece)
 
     def up(self):
         if self.rank in ('8', '0'):
-            return Square('00')
+            return OFF_BOARD
         next_rank = Square.ranks[Square.ranks.index(self.rank) + 1]
         return Square(self.file + next_rank)
 
     def down(self):
         if self.rank in ('1', '0'):
-            return Square('00')
+            return OFF_BOARD
         next_rank = Square.ranks[Square.ranks.index(self.rank) - 1]
         return Square(self.file + next_rank)
 
     def left(self):
         if self.file in ('a', '0'):
-            return Square('00')
+            return OFF_BOARD
         next_file = Square.files[Square.files.index(self.file) - 1]
         return Square(next_file + self.rank)
 
     def right(self):
         if self.file in ('h', '0'):
-            return Square('00')
+            return OFF_BOARD
         next_file = Square.files[Square.files.index(self.file) + 1]
         return Square(next_file + self.rank)
+
+
+def _unpickle_unique(coordinates: str, piece) -> Square:
+    square = Square.unique(coordinates)
+    square.piece = piece
+    return square
+
+
+# Maps coordinates such as 'e4' to the index of that square on a bitboard: a1 is 0, b1 is 1, ..., h8 is 63
+INDICES = {file + rank: 8 * i + j for i, rank in enumerate(Square.ranks) for j, file in enumerate(Square.files)}
+
+_INTERNED = {}
+_INTERNED.update((coordinates, Square.unique(coordinates)) for coordinates in list(INDICES) + ['00'])
+
+OFF_BOARD = Square('00')
@@ -0,0 +1,199 @@
+"""
+A fixed size transposition table for search results, keyed by the Zobrist key of a position (see metaknight.zobrist).
+
+Entries live in two flat arrays of unsigned 64 bit integers, one for keys and one for data, so the table never grows
+past the memory budget it was created with. Each slot stores its key XORed with its data, so an entry whose two halves
+were written at different times, for example by two processes sharing the table, fails the key check instead of
+being read as valid.
+
+The slots are grouped into buckets of BUCKET_SIZE, and the replacement policy picks the slot of a bucket that a new
+result overwrites.
+"""
+from array import array
+from typing import NamedTuple, Optional
+
+# Bound types
+EXACT = 0
+LOWER_BOUND = 1  # The search failed high: the score is at least this much
+UPPER_BOUND = 2  # The search failed low: the score is at most this much
+
+# Replacement policies
+DEPTH_PREFERRED = 'depth'  # keep the deepest results
+ALWAYS_REPLACE = 'always'  # keep the newest results
+TWO_TIER = 'two-tier'  # the first slot of each bucket keeps the deepest result, the others the newest
+
+BUCKET_SIZE = 2
+ENTRY_BYTES = 16  # a key and a data word
+
+# Layout of the data word, from the least significant bit:
+# 16 bits of move, 8 bits of depth, 2 bits of bound, 6 bits of age and 32 bits of score offset by SCORE_OFFSET
+SCORE_OFFSET = 1 << 31
+_MOVE_MASK = 0xffff
+_DEPTH_SHIFT = 16
+_BOUND_SHIFT = 24
+_AGE_SHIFT = 26
+_AGE_MASK = 0x3f
+_SCORE_SHIFT = 32
+_KEY_MASK = (1 << 64) - 1
+
+
+class Entry(NamedTuple):
+    depth: int
+    bound: int
+    score: int
+    move: int  # an encoded move, 0 if there is none
+
+
+def _bucket_count(size_mb: float) -> int:
+    buckets = max(1, int(size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE))
+    return 1 << (buckets.bit_length() - 1)  # a power of two, so a key is mapped to a bucket with a mask
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float=16, replacement: str=TWO_TIER, buffer=None):
+        """
+        :param size_mb: the memory budget of the table in megabytes
+        :param replacement: DEPTH_PREFERRED, ALWAYS_REPLACE or TWO_TIER
+        :param buffer: a writable buffer of at least TranspositionTable.bytes_needed(size_mb) bytes to keep the entries
+        in, for example the buf of a multiprocessing.shared_memory.SharedMemory, so that processes share the table.
+        None to allocate the table privately
+        """
+        if replacement not in (DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER):
+            raise ValueError(f'Unknown replacement policy {replacement}')
+        self.replacement = replacement
+        self.buckets = _bucket_count(size_mb)
+        slots = BUCKET_SIZE * self.buckets
+
+        self._view = None
+        if buffer is None:
+            self.keys = array('Q', bytes(8 * slots))
+            self.data = array('Q', bytes(8 * slots))
+        else:
+            if len(memoryview(buffer).cast('B')) < 16 * slots:
+                raise ValueError(f'The buffer is smaller than the {16 * slots} bytes the table needs')
+            self._view = memoryview(buffer).cast('B')[:16 * slots].cast('Q')
+            self.keys = self._view[:slots]
+            self.data = self._view[slots:]
+        self.age = 0
+
+    @staticmethod
+    def bytes_needed(size_mb: float) -> int:
+        """
+        :return: the size of the buffer that a table of size_mb keeps its entries in
+        """
+        return ENTRY_BYTES * BUCKET_SIZE * _bucket_count(size_mb)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        zeros = array('Q', bytes(8 * len(self.keys)))
+        self.keys[:] = zeros
+        self.data[:] = zeros
+        self.age = 0
+
+    def close(self):
+        """
+        Lets go of the buffer the table was created with, so that it can be closed. The table can't be used afterwards
+        """
+        if self._view is not None:
+            self.keys.release()
+            self.data.release()
+            self._view.release()
+            self._view = None
+
+    def new_search(self):
+        """
+        Marks every stored result as coming from an older search, so that the replacement policy prefers to overwrite it
+        """
+        self.age = (self.age + 1) & _AGE_MASK
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """
+        :param key: the Zobrist key of a position
+        :return: the stored result for the position, None if there is none
+        """
+        first = (key & (self.buckets - 1)) * BUCKET_SIZE
+        keys = self.keys
+        data = self.data
+        for slot in range(first, first + BUCKET_SIZE):
+            word = data[slot]
+            if keys[slot] ^ word == key and word:
+                return Entry((word >> _DEPTH_SHIFT) & 0xff, (word >> _BOUND_SHIFT) & 3,
+                             (word >> _SCORE_SHIFT) - SCORE_OFFSET, word & _MOVE_MASK)
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int=0):
+        """
+        Saves a search result, overwriting a slot of the position's bucket chosen by the replacement policy
+        :param key: the Zobrist key of the position
+        :param depth: the depth the position was searched to, 0 to 255
+        :param bound: EXACT, LOWER_BOUND or UPPER_BOUND
+        :param score: the score of the position, in centipawns
+        :param move: the best move found, encoded in 16 bits
+        """
+        first = (key & (self.buckets - 1)) * BUCKET_SIZE
+        keys = self.keys
+        data = self.data
+        slot = self._choose_slot(key, depth, first)
+        if slot < 0:
+            return
+        if not move and keys[slot] ^ data[slot] == key:
+            # Keep the move of the previous result for this position, it is still the best guess
+            move = data[slot] & _MOVE_MASK
+        word = (move & _MOVE_MASK) | (min(max(depth, 0), 0xff) << _DEPTH_SHIFT) | (bound << _BOUND_SHIFT) | \
+               (self.age << _AGE_SHIFT) | ((score + SCORE_OFFSET) << _SCORE_SHIFT)
+        keys[slot] = (key ^ word) & _KEY_MASK
+        data[slot] = word
+
+    def _choose_slot(self, key: int, depth: int, first: int) -> int:
+        """
+        :return: the slot of the bucket starting at first to write a result of depth into, -1 to keep the bucket as is
+        """
+        keys = self.keys
+        data = self.data
+        for slot in range(first, first + BUCKET_SIZE):
+            if keys[slot] ^ data[slot] == key and data[slot]:
+                # The position is already stored
+                if self.replacement == ALWAYS_REPLACE or depth >= self._depth(slot) or self._stale(slot) or \
+                        (self.replacement == TWO_TIER and slot != first):
+                    return slot
+                return -1
+
+        if self.replacement == ALWAYS_REPLACE:
+            return first + (key >> 32) % BUCKET_SIZE
+        if self.replacement == TWO_TIER:
+            if depth >= self._depth(first) or self._stale(first):
+                return first
+            return first + 1 + (key >> 32) % (BUCKET_SIZE - 1)
+
+        # Depth preferred: overwrite the shallowest result, preferring results of older searches
+        best = first
+        for slot in range(first, first + BUCKET_SIZE):
+            if self._replace_value(slot) < self._replace_value(best):
+                best = slot
+        if self._stale(best) or depth >= self._depth(best) or not data[best]:
+            return best
+        return -1
+
+    def _depth(self, slot: int) -> int:
+        return (self.data[slot] >> _DEPTH_SHIFT) & 0xff
+
+    def _stale(self, slot: int) -> bool:
+        return ((self.data[slot] >> _AGE_SHIFT) & _AGE_MASK) != self.age
+
+    def _replace_value(self, slot: int) -> int:
+        if not self.data[slot]:
+            return -1
+        return self._depth(slot) + (0 if self._stale(slot) else 256)
+
+    def usage(self) -> float:
+        """
+        :return: the fraction of slots that hold a result of the current search
+        """
+        sample = min(len(self.data), 1000)
+        used = 0
+        for slot in range(sample):
+            if self.data[slot] and not self._stale(slot):
+                used += 1
+        return used / sample
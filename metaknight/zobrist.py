@@ -0,0 +1,42 @@
+"""
+Zobrist hashing: a position is identified by the XOR of a random 64 bit key for every feature of the position.
+Playing or undoing a move only changes a few features, so the key can be updated incrementally.
+The random generator is seeded so that every process computes the same keys for the same position
+"""
+from metaknight.piece import Color
+from random import Random
+
+_random = Random(0x6d6574616b6e6967)
+
+
+def _key() -> int:
+    return _random.getrandbits(64)
+
+
+# PIECE_KEYS[bitboard_index(piece_type, color)][square index]
+PIECE_KEYS = [[_key() for _ in range(64)] for _ in range(12)]
+
+BLACK_TO_MOVE = _key()
+
+# CASTLING_KEYS[color.value][0] is for castling king side, CASTLING_KEYS[color.value][1] for castling queen side
+CASTLING_KEYS = [[_key(), _key()], [_key(), _key()]]
+
+# EN_PASSANT_KEYS[file index] is included when a pawn may be captured en passant on that file
+EN_PASSANT_KEYS = [_key() for _ in range(8)]
+
+
+def state_key(to_move: Color, castling, en_passant_file: str=None) -> int:
+    """
+    :param to_move: the player to move
+    :param castling: castling[color.value] is (can castle king side, can castle queen side) for each color
+    :param en_passant_file: the file that en passant is possible on, None if there is none
+    :return: the part of a position's key that does not depend on the pieces on the board
+    """
+    key = BLACK_TO_MOVE if to_move is Color.BLACK else 0
+    for color in (0, 1):
+        for side in (0, 1):
+            if castling[color][side]:
+                key ^= CASTLING_KEYS[color][side]
+    if en_passant_file:
+        key ^= EN_PASSANT_KEYS[ord(en_passant_file) - ord('a')]
+    return key
@@ -0,0 +1,53 @@
+from unittest import TestCase
+from metaknight.attacks import KNIGHT_TARGETS, KING_TARGETS, PAWN_CAPTURE_TARGETS, \
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks, queen_attacks
+from metaknight.square import Square
+from metaknight.piece import Color
+
+
+def index(location: str) -> int:
+    return Square(location).index
+
+
+def bitboard(*locations: str) -> int:
+    result = 0
+    for location in locations:
+        result |= 1 << index(location)
+    return result
+
+
+class AttackTests(TestCase):
+    def test_knight_attacks(self):
+        self.assertEqual(KNIGHT_TARGETS[index('a1')], (index('b3'), index('c2')))
+        self.assertEqual(len(KNIGHT_TARGETS[index('e4')]), 8)
+        self.assertEqual(KNIGHT_ATTACKS[index('h8')], (1 << index('g6')) | (1 << index('f7')))
+
+    def test_king_attacks(self):
+        self.assertEqual(KING_TARGETS[index('a1')], (index('a2'), index('b2'), index('b1')))
+        self.assertEqual(len(KING_TARGETS[index('d5')]), 8)
+        self.assertEqual(bin(KING_ATTACKS[index('h4')]).count('1'), 5)
+
+    def test_pawn_attacks(self):
+        self.assertEqual(PAWN_CAPTURE_TARGETS[Color.WHITE.value][index('e4')], (index('d5'), index('f5')))
+        self.assertEqual(PAWN_CAPTURE_TARGETS[Color.BLACK.value][index('e4')], (index('d3'), index('f3')))
+        self.assertEqual(PAWN_CAPTURE_TARGETS[Color.WHITE.value][index('a2')], (index('b3'),))
+        self.assertEqual(PAWN_ATTACKS[Color.BLACK.value][index('h7')], 1 << index('g6'))
+        self.assertEqual(PAWN_ATTACKS[Color.WHITE.value][index('c8')], 0)
+
+    def test_rook_attacks(self):
+        self.assertEqual(rook_attacks(index('a1'), 0), bitboard('a2', 'a3', 'a4', 'a5', 'a6', 'a7', 'a8',
+                                                               'b1', 'c1', 'd1', 'e1', 'f1', 'g1', 'h1'))
+        occupied = bitboard('d1', 'd6', 'b4', 'g4', 'h4')
+        self.assertEqual(rook_attacks(index('d4'), occupied), bitboard('d1', 'd2', 'd3', 'd5', 'd6',
+                                                                       'b4', 'c4', 'e4', 'f4', 'g4'))
+
+    def test_bishop_attacks(self):
+        self.assertEqual(bishop_attacks(index('h8'), bitboard('e5')), bitboard('g7', 'f6', 'e5'))
+        occupied = bitboard('b2', 'f6', 'c5')
+        self.assertEqual(bishop_attacks(index('d4'), occupied), bitboard('c3', 'b2', 'e5', 'f6', 'c5',
+                                                                         'e3', 'f2', 'g1'))
+
+    def test_queen_attacks(self):
+        occupied = bitboard('b2', 'f6', 'c5', 'd1', 'd6', 'b4', 'g4', 'h4')
+        self.assertEqual(queen_attacks(index('d4'), occupied),
+                         rook_attacks(index('d4'), occupied) | bishop_attacks(index('d4'), occupied))
@@ -1,7 +1,9 @@
 from unittest import TestCase
-from metaknight.board import Board
+from metaknight.game import Game
+from copy import deepcopy
+from metaknight.board import Board, bitboard_index
 from metaknight.square import Square
-from metaknight.piece import Color
+from metaknight.piece import Color, Piece, PieceType
 
 
 class BoardTests(TestCase):
@@ -140,12 +142,80 @@ class BoardTests(TestCase):
         # black king
         self.assertEqual(self.board._king_moves(Square('g8')), [[Square('h8')]])
 
+    def test_attacks_from(self):
+        self.set_test_position_2()
+        attacks = self.board.attacks_from(self.board.get_square('f7').index)
+        self.assertTrue(attacks & (1 << self.board.get_square('f3').index))
+        self.assertTrue(attacks & (1 << self.board.get_square('c7').index))
+        self.assertFalse(attacks & (1 << self.board.get_square('f2').index))
+        self.assertFalse(attacks & (1 << self.board.get_square('b7').index))
+
     def test_in_check(self):
         self.set_test_position_2()
         self.assertEqual(self.board.in_check(Color.BLACK), True)
         self.assertEqual(self.board.in_check(Color.WHITE), False)
 
+    def test_is_square_attacked(self):
+        self.set_test_position_1()
+        self.assertTrue(self.board.is_square_attacked(Square('h8'), Color.WHITE))  # knight on g6
+        self.assertTrue(self.board.is_square_attacked(Square('b6'), Color.WHITE))  # pawn on c5
+        self.assertTrue(self.board.is_square_attacked(Square('e5'), Color.BLACK))  # queen on e6
+        self.assertTrue(self.board.is_square_attacked(Square('a6'), Color.BLACK))  # pawn on b7
+        self.assertFalse(self.board.is_square_attacked(Square('h3'), Color.BLACK))
+        self.assertFalse(self.board.is_square_attacked(Square('e2'), Color.BLACK))  # the pawn on e4 blocks the queen
+
+    def test_king_squares(self):
+        self.assertEqual(self.board.king_squares, [Square('e1').index, Square('e8').index])
+        self.set_test_position_2()
+        self.assertEqual(self.board.king_squares, [Square('f3').index, Square('c7').index])
+        self.board.set_piece(None, location='f3')
+        self.assertEqual(self.board.king_squares[Color.WHITE.value], -1)
+        self.assertEqual(self.board.in_check(Color.WHITE), False)
+
     def test_evaluate_by_material(self):
         self.assertEqual(self.board.evaluate_by_material(), 0)
         self.set_test_position_2()
-        self.assertEqual(self.board.evaluate_by_material(), 2)
\ No newline at end of file
+        self.assertEqual(self.board.evaluate_by_material(), 2)
+
+    def test_bitboards(self):
+        self.assertEqual(self.board.occupancy[Color.WHITE.value], 0xffff)
+        self.assertEqual(self.board.occupancy[Color.BLACK.value], 0xffff << 48)
+        self.assertEqual(self.board.bitboards[bitboard_index(PieceType.KING, Color.WHITE)], 1 << 4)
+        self.assertEqual(self.board.bitboards[bitboard_index(PieceType.KNIGHT, Color.BLACK)], (1 << 57) | (1 << 62))
+
+        self.board.set_piece(None, location='e2')
+        self.board.set_piece(Piece(PieceType.PAWN, Color.WHITE), location='e4')
+        self.assertEqual(self.board.bitboards[bitboard_index(PieceType.PAWN, Color.WHITE)], 0xef00 | (1 << 28))
+        self.assertEqual(self.board.get_square('e4').piece, Piece(PieceType.PAWN, Color.WHITE))
+
+        self.board.set_piece(Piece(PieceType.QUEEN, Color.BLACK), location='e4')
+        self.assertEqual(self.board.bitboards[bitboard_index(PieceType.PAWN, Color.WHITE)], 0xef00)
+        self.assertEqual(self.board.occupancy[Color.WHITE.value], 0xefff)
+        self.assertTrue(self.board.occupancy[Color.BLACK.value] & (1 << 28))
+
+    def test_pieces_are_interned(self):
+        self.assertIs(Piece(PieceType.KING, Color.WHITE), Piece(PieceType.KING, Color.WHITE))
+        self.assertIsNot(Piece(PieceType.KING, Color.WHITE), Piece(PieceType.KING, Color.BLACK))
+        self.assertIs(self.board.get_square('e1').piece, Piece(PieceType.KING, Color.WHITE))
+        self.assertIs(deepcopy(self.board).get_square('d8').piece, Piece(PieceType.QUEEN, Color.BLACK))
+
+    def test_evaluate(self):
+        self.assertEqual(self.board.evaluate(), 0)
+        self.assertEqual(self.board.phase, 24)
+        game = Game()
+        for notation in ['e4', 'd5', 'exd5', 'Qxd5', 'Nc3', 'Qa5', 'd4', 'Nf6', 'Nf3', 'Bf5', 'Bc4', 'e6']:
+            game.play_move(notation)
+            scratch = Game.from_fen(game.to_fen()).board
+            self.assertEqual(game.board.evaluate_centipawns(), scratch.evaluate_centipawns())
+            self.assertEqual(game.board.evaluate_by_material(), scratch.evaluate_by_material())
+        self.assertGreater(game.board.evaluate(), 0)
+        for _ in range(12):
+            game.undo_move()
+        self.assertEqual(game.board.evaluate(), 0)
+
+        # A position and its mirror image
+        white = Game.from_fen('4k3/8/8/8/3N4/8/PP6/4K3 w - - 0 1').board
+        black = Game.from_fen('4k3/pp6/8/3n4/8/8/8/4K3 w - - 0 1').board
+        self.assertEqual(white.phase, 1)
+        self.assertEqual(white.evaluate_centipawns(), -black.evaluate_centipawns())
+        self.assertEqual(white.evaluate_by_material(), 5)
@@ -0,0 +1,25 @@
+from unittest import TestCase
+from metaknight.evaluation import MIDDLEGAME_TABLES, ENDGAME_TABLES, MAX_PHASE, tapered
+from metaknight.board import bitboard_index
+from metaknight.piece import PieceType, Color
+from metaknight.square import Square
+
+
+class EvaluationTests(TestCase):
+    def test_tables(self):
+        white_knight = bitboard_index(PieceType.KNIGHT, Color.WHITE)
+        black_knight = bitboard_index(PieceType.KNIGHT, Color.BLACK)
+        self.assertGreater(MIDDLEGAME_TABLES[white_knight][Square('e4').index],
+                           MIDDLEGAME_TABLES[white_knight][Square('a1').index])
+        self.assertEqual(MIDDLEGAME_TABLES[black_knight][Square('c6').index],
+                         -MIDDLEGAME_TABLES[white_knight][Square('c3').index])
+
+        white_pawn = bitboard_index(PieceType.PAWN, Color.WHITE)
+        self.assertGreater(ENDGAME_TABLES[white_pawn][Square('a7').index], ENDGAME_TABLES[white_pawn][Square('a2').index])
+
+    def test_tapered(self):
+        self.assertEqual(tapered(100, 300, MAX_PHASE), 100)
+        self.assertEqual(tapered(100, 300, 0), 300)
+        self.assertEqual(tapered(100, 300, MAX_PHASE // 2), 200)
+        self.assertEqual(tapered(100, 300, 2 * MAX_PHASE), 100)
+        self.assertEqual(tapered(-1, -2, 5), -tapered(1, 2, 5))
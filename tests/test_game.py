@@ -1,5 +1,6 @@
 from unittest import TestCase
-from metaknight.game import Game
+from metaknight.game import Game, GameStatus, encode_move, STARTING_FEN
+from metaknight.movegen import new_move_buffer
 from metaknight.move import InvalidNotationError
 from metaknight.piece import Piece, PieceType, Color
 
@@ -29,6 +30,46 @@ class TestGame(TestCase):
         self.assertEqual(self.game_copy.board.get_square('f3').piece, Piece(PieceType.QUEEN, Color.WHITE))
         self.assertEqual(self.game_copy.board.get_square('e7').piece, Piece(PieceType.KNIGHT, Color.BLACK))
 
+    def test_copy_undo(self):
+        for move in ('e4', 'd5', 'exd5', 'Nf6', 'Bb5+', 'c6'):
+            self.game.play_move(move)
+        fen = self.game.to_fen()
+        key = self.game.zobrist_key
+
+        game_copy = self.game.copy()
+        self.assertIs(game_copy.game_history[-1], self.game.game_history[-1])
+        # The copy can undo the moves played before it was made, without changing the original
+        while game_copy.game_history:
+            game_copy.undo_move()
+        self.assertEqual(game_copy.to_fen(), STARTING_FEN)
+        self.assertEqual(game_copy.board.evaluate_centipawns(), Game().board.evaluate_centipawns())
+        self.assertEqual(len(self.game.game_history), 6)
+        self.assertEqual(self.game.to_fen(), fen)
+        self.assertEqual(self.game.zobrist_key, key)
+
+        game_copy.play_move('d4')
+        self.game.undo_move()
+        self.game.play_move('Nc6')
+        self.assertEqual(self.game.to_fen(), 'r1bqkb1r/ppp1pppp/2n2n2/1B1P4/8/8/PPPP1PPP/RNBQK1NR w KQkq - 3 4')
+        self.assertEqual(game_copy.to_fen(), 'rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq d3 0 1')
+
+    def test_copy_castling_rights(self):
+        for move in ('e4', 'e5', 'Nf3'):
+            self.game.play_move(move)
+        game_copy = self.game.copy()
+        game_copy.undo_move()
+        game_copy.play_move('Ke2')
+        self.assertEqual(game_copy.castling_rights(), [[False, False], [True, True]])
+
+        # The king move of the copy leaves the castling rights of the original alone
+        self.game.undo_move()
+        self.assertEqual(self.game.castling_rights(), [[True, True], [True, True]])
+        self.assertEqual(self.game.to_fen(), 'rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2')
+        self.assertEqual(self.game.zobrist_key, Game.from_fen(self.game.to_fen()).zobrist_key)
+        for move in ('Nf3', 'Nc6', 'Bc4', 'Nf6'):
+            self.game.play_move(move)
+        self.assertIn('O-O', {self.game.san(move) for move in self.game.generate_moves()})
+
     def test_promotion(self):
         self.game.play_move('e4')
         self.game.play_move('d5')
@@ -245,3 +286,229 @@ class TestGame(TestCase):
         self.game.play_move(notation='Rh7')
         self.game.play_move(notation='Rd8')
         self.game.play_move(notation='Rd5')
+
+    def test_zobrist_key(self):
+        initial = self.game.zobrist_key
+        for notation in ('Nf3', 'Nf6', 'Nc3', 'Nc6'):
+            self.game.play_move(notation)
+        transposition = Game()
+        for notation in ('Nc3', 'Nc6', 'Nf3', 'Nf6'):
+            transposition.play_move(notation)
+        self.assertEqual(self.game.zobrist_key, transposition.zobrist_key)
+
+        # The same pieces, but the knights went back and forth, so the player to move differs
+        self.game.play_move('Nb1')
+        self.game.play_move('Nb8')
+        self.game.play_move('Ng1')
+        self.assertNotEqual(self.game.zobrist_key, initial)
+        self.game.play_move('Ng8')
+        self.assertEqual(self.game.zobrist_key, initial)
+
+        for _ in range(8):
+            self.game.undo_move()
+        self.assertEqual(self.game.zobrist_key, initial)
+
+    def test_zobrist_key_castling_and_en_passant(self):
+        for notation in ('e4', 'd5', 'e5', 'f5'):
+            self.game.play_move(notation)
+        with_en_passant = self.game.zobrist_key
+        self.game.play_move('Nf3')
+        self.game.play_move('Nc6')
+        self.game.play_move('Ng1')
+        self.game.play_move('Nb8')
+        self.assertNotEqual(self.game.zobrist_key, with_en_passant)
+
+        self.game.play_move('Ke2')
+        self.game.play_move('Nc6')
+        self.game.play_move('Ke1')
+        self.game.play_move('Nb8')
+        self.assertNotEqual(self.game.zobrist_key, with_en_passant)
+        self.assertEqual(self.game.castling_rights(), [[False, False], [True, True]])
+
+        self.game.undo_move()
+        self.game.undo_move()
+        self.game.undo_move()
+        self.game.undo_move()
+        self.assertEqual(self.game.castling_rights(), [[True, True], [True, True]])
+
+    def test_undo_move(self):
+        self.game.play_move('e4')
+        self.game.play_move('d5')
+        self.game.play_move('exd5')
+        self.assertEqual(self.game.black_captured, [PieceType.PAWN])
+        self.game.undo_move()
+        self.assertEqual(self.game.black_captured, [])
+        self.assertEqual(self.game.board.get_square('d5').piece, Piece(PieceType.PAWN, Color.BLACK))
+        self.assertEqual(self.game.to_move, Color.WHITE)
+
+    def test_iter_possible_games(self):
+        lines = self.game.iter_possible_games(3)
+        first = next(lines)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(self.game.game_history), 3)
+        lines.close()
+        self.assertEqual(len(self.game.game_history), 0)
+        self.assertEqual(repr(self.game.board), repr(Game().board))
+
+        captures = [line for line in self.game.iter_possible_games(3) if line[-1].piece_captured]
+        self.assertEqual(len(captures), 34)
+        self.assertEqual(sum(1 for _ in self.game.iter_possible_games(3)), 8902)
+
+    def test_move_codes(self):
+        game = Game()
+        for notation in ['e4', 'd5', 'exd5', 'c5', 'dxc6', 'Nf6', 'Nf3', 'e6', 'Bb5+', 'Bd7']:
+            game.play_move(notation)
+        buffer = new_move_buffer()
+        count = game.generate_move_codes(buffer)
+        self.assertEqual(count, game.count_moves())
+        moves = game.generate_moves()
+        self.assertEqual(len(moves), count)
+        for code, move in zip(buffer, moves):
+            self.assertEqual(repr(game.decode_move(code)), repr(move))
+            self.assertEqual(encode_move(move), code)
+        self.assertIn('king-side castle', [repr(move) for move in moves])
+
+    def test_from_fen(self):
+        game = Game.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b Kq a3 5 20')
+        self.assertEqual(game.board.get_square('e2').piece, Piece(PieceType.BISHOP, Color.WHITE))
+        self.assertEqual(game.board.get_square('h3').piece, Piece(PieceType.PAWN, Color.BLACK))
+        self.assertEqual(game.board.get_square('e1').piece, Piece(PieceType.KING, Color.WHITE))
+        self.assertEqual(game.to_move, Color.BLACK)
+        self.assertEqual(game.castling_rights(), [[True, False], [False, True]])
+        self.assertEqual(game.en_passant_file(), 'a')
+        self.assertEqual(game.halfmove_clock(), 5)
+        self.assertEqual(game.fullmove_number(), 20)
+
+        self.assertEqual(Game.from_fen(STARTING_FEN).zobrist_key, Game().zobrist_key)
+        self.assertEqual(Game.from_fen('8/8/8/8/8/8/8/K6k w - -').to_fen(), '8/8/8/8/8/8/8/K6k w - - 0 1')
+        for fen in ['', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq -',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq -',
+                    'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq -',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQxq -',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e4',
+                    '4k3/8/8/3Pp3/8/8/8/4K3 w - e3 0 1',
+                    '4k3/8/8/8/3pP3/8/8/4K3 b - e6 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 0']:
+            self.assertRaises(ValueError, lambda: Game.from_fen(fen))
+
+    def test_to_fen(self):
+        self.assertEqual(self.game.to_fen(), STARTING_FEN)
+        fens = ['rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1',
+                'rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2',
+                'rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2',
+                'r1bqkbnr/pp1ppppp/2n5/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3']
+        for notation, fen in zip(['e4', 'c5', 'Nf3', 'Nc6'], fens):
+            self.game.play_move(notation)
+            self.assertEqual(self.game.to_fen(), fen)
+            copy = Game.from_fen(fen)
+            self.assertEqual(copy.to_fen(), fen)
+            self.assertEqual(copy.zobrist_key, self.game.zobrist_key)
+
+    def test_notation_parser(self):
+        game = Game.from_fen('1r2k3/P7/8/8/7Q/8/8/R3K2Q w Q - 0 1')
+        self.assertEqual(repr(game.notation_parser('axb8=N+')), 'a7 takes b8')
+        self.assertEqual(game.notation_parser('axb8=N+').promotion, PieceType.KNIGHT)
+        self.assertEqual(game.notation_parser('a8').promotion, PieceType.QUEEN)
+        self.assertEqual(repr(game.notation_parser('Q4e4')), 'h4 -> e4')
+        self.assertEqual(repr(game.notation_parser('Qhh2')), 'h1 -> h2')
+        self.assertEqual(repr(game.notation_parser('Q1h2')), 'h1 -> h2')
+        self.assertEqual(repr(game.notation_parser('O-O-O+')), 'queen-side castle')
+        self.assertEqual(repr(game.notation_parser('0-0-0')), 'queen-side castle')
+        for notation in ['O-O', 'Nf3', 'Qh9', 'Qxb8', 'Ke3', 'e4!!', 'Bishop']:
+            self.assertRaises(InvalidNotationError, lambda: game.notation_parser(notation))
+
+    def test_san(self):
+        game = Game.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+        names = set()
+        for move in game.generate_moves():
+            san = game.san(move)
+            names.add(san)
+            self.assertEqual(encode_move(game.notation_parser(san)), encode_move(move))
+        self.assertEqual(len(names), 48)
+        self.assertTrue({'O-O', 'O-O-O', 'Qxf6', 'dxe6', 'Nxf7', 'Bxa6', 'Rf1', 'Ng4'} <= names)
+
+        game = Game.from_fen('3k4/8/3K4/8/8/8/8/R6R w - - 0 1')
+        moves = {game.san(move) for move in game.generate_moves()}
+        self.assertIn('Ra8#', moves)
+        self.assertIn('Rhd1', moves)
+        self.assertIn('Rad1', moves)
+        self.assertIn('Rab1', moves)
+
+        game = Game.from_fen('4k3/8/8/8/8/1N3N2/8/1N2K3 w - - 0 1')
+        moves = {game.san(move) for move in game.generate_moves()}
+        self.assertTrue({'Nb3d2', 'N1d2', 'Nfd2', 'Nbd4', 'Nfd4', 'Na3'} <= moves)
+
+    def test_repetition(self):
+        for move in ('Nf3', 'Nf6', 'Ng1', 'Ng8'):
+            self.game.play_move(move)
+        self.assertEqual(self.game.repetitions(), 2)
+        self.assertFalse(self.game.is_draw_by_repetition())
+        for move in ('Nf3', 'Nf6', 'Ng1'):
+            self.game.play_move(move)
+        self.assertEqual(self.game.repetitions(), 2)
+        self.game.play_move('Ng8')
+        self.assertTrue(self.game.is_draw_by_repetition())
+        self.game.undo_move()
+        self.assertFalse(self.game.is_draw_by_repetition())
+
+        # A pawn move can't be undone, so the positions before it are not looked at again
+        self.game.play_move('e5')
+        self.game.play_move('Nf3')
+        self.game.play_move('Ng8')
+        self.game.play_move('Ng1')
+        self.assertEqual(self.game.repetitions(), 1)
+
+    def test_fifty_move_rule(self):
+        game = Game.from_fen('4k3/8/8/8/8/8/4P3/R3K3 w - - 98 80')
+        game.play_move('Ra2')
+        self.assertFalse(game.is_draw_by_fifty_move_rule())
+        game.play_move('Kd7')
+        self.assertTrue(game.is_draw_by_fifty_move_rule())
+        self.assertEqual(game.halfmove_clock(), 100)
+        game.undo_move()
+        game.play_move('Ke7')
+        game.undo_move()
+        self.assertEqual(game.halfmove_clock(), 99)
+        game.play_move('Kf7')
+        game.play_move('e4')
+        self.assertEqual(game.halfmove_clock(), 0)
+        game.undo_move()
+        self.assertEqual(game.halfmove_clock(), 100)
+
+    def test_insufficient_material(self):
+        self.assertFalse(self.game.is_draw_by_insufficient_material())
+        for fen, draw in (('4k3/8/8/8/8/8/8/4K3 w - - 0 1', True),
+                          ('4k3/8/8/8/8/8/8/2B1K3 w - - 0 1', True),
+                          ('4k3/8/8/8/8/8/8/1N2K3 w - - 0 1', True),
+                          ('2b1k3/8/8/8/8/8/8/2B1K3 w - - 0 1', False),
+                          ('3bk3/8/8/8/8/8/8/2B1K3 w - - 0 1', True),
+                          ('3bk3/8/8/8/8/8/1B6/2B1K3 w - - 0 1', True),
+                          ('4k3/8/8/8/8/8/8/1NN1K3 w - - 0 1', False),
+                          ('1n2k3/8/8/8/8/8/8/2B1K3 w - - 0 1', False),
+                          ('4k3/8/8/8/8/8/7P/4K3 w - - 0 1', False),
+                          ('4k3/8/8/8/8/8/8/R3K3 w - - 0 1', False)):
+            self.assertEqual(Game.from_fen(fen).is_draw_by_insufficient_material(), draw, fen)
+
+    def test_game_status(self):
+        self.assertIs(self.game.game_status(), GameStatus.ONGOING)
+        self.assertFalse(self.game.game_status().is_over())
+        for move in ('f3', 'e5', 'g4', 'Qh4'):
+            self.game.play_move(move)
+        self.assertIs(self.game.game_status(), GameStatus.CHECKMATE)
+        self.assertTrue(self.game.is_checkmate())
+        self.assertFalse(self.game.game_status().is_draw())
+
+        game = Game.from_fen('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1')
+        self.assertIs(game.game_status(), GameStatus.STALEMATE)
+        self.assertTrue(game.is_stalemate())
+        self.assertTrue(game.game_status().is_draw())
+        self.assertIs(Game.from_fen('4k3/8/8/8/8/8/8/1N2K3 w - - 0 1').game_status(), GameStatus.INSUFFICIENT_MATERIAL)
+        self.assertIs(Game.from_fen('4k3/8/8/8/8/8/8/R3K3 w - - 100 80').game_status(), GameStatus.FIFTY_MOVE_RULE)
+        # Mate on the hundredth move still wins
+        self.assertIs(Game.from_fen('R3k3/8/4K3/8/8/8/8/8 b - - 100 80').game_status(), GameStatus.CHECKMATE)
+
+        self.game = Game()
+        for move in ('Nf3', 'Nf6', 'Ng1', 'Ng8') * 2:
+            self.game.play_move(move)
+        self.assertIs(self.game.game_status(), GameStatus.REPETITION)
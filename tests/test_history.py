@@ -0,0 +1,31 @@
+from unittest import TestCase
+from metaknight.history import History
+from copy import deepcopy
+
+
+class TestHistory(TestCase):
+    def setUp(self):
+        self.history = History(['e4', 'e5', 'Nf3'])
+
+    def test_stack(self):
+        self.assertEqual(len(self.history), 3)
+        self.assertEqual(self.history[-1], 'Nf3')
+        self.assertEqual(self.history[0], 'e4')
+        self.assertEqual(list(self.history), ['e4', 'e5', 'Nf3'])
+        self.assertEqual(list(reversed(self.history)), ['Nf3', 'e5', 'e4'])
+        self.assertEqual(self.history.pop(), 'Nf3')
+        self.assertEqual(self.history, ['e4', 'e5'])
+        self.assertRaises(IndexError, lambda: self.history[2])
+        self.assertRaises(IndexError, History().pop)
+        self.assertFalse(History())
+
+    def test_copy(self):
+        history_copy = self.history.copy()
+        history_copy.pop()
+        history_copy.append('Nc3')
+        self.history.append('Nc6')
+        self.assertEqual(self.history, ['e4', 'e5', 'Nf3', 'Nc6'])
+        self.assertEqual(history_copy, ['e4', 'e5', 'Nc3'])
+
+        long_history = History(range(10000))
+        self.assertEqual(deepcopy(long_history), long_history)
@@ -0,0 +1,58 @@
+from unittest import TestCase
+from metaknight.ingest import iter_chunks, replay_chunk, ingest, read_batch, main
+from tests.test_pgn import PGN
+from io import StringIO
+import os
+import tempfile
+
+BAD_GAME = '[Event "Broken"]\n\n1. e4 e5 2. Qd9 *\n'
+
+
+class IngestTests(TestCase):
+    def test_iter_chunks(self):
+        text = PGN + '\n' + BAD_GAME
+        chunks = list(iter_chunks(StringIO(text), 2))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(''.join(chunks), text)
+        self.assertTrue(chunks[1].startswith('[Event "Broken"]'))
+        self.assertEqual(len(list(iter_chunks(StringIO(text), 1))), 3)
+
+        # A line of a comment that starts with [ is not the headers of a new game
+        text = '[Event "A"]\n\n1. e4 {a comment that goes on\n[%clk 0:03:00] and ends here} e5 1-0\n\n' \
+               '[Event "B"]\n\n1. d4 0-1\n'
+        chunks = list(iter_chunks(StringIO(text), 1))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[1].startswith('[Event "B"]'))
+        batch = replay_chunk(chunks[0])
+        self.assertEqual(batch['games']['moves'], ['e4 e5'])
+        self.assertEqual(batch['games']['result'], ['1-0'])
+
+    def test_replay_chunk(self):
+        batch = replay_chunk(BAD_GAME + '\n' + PGN)
+        self.assertEqual(batch['errors'][0][0], 0)
+        self.assertEqual(batch['games']['result'], ['1/2-1/2', '*'])
+        self.assertEqual(batch['games']['plies'], [46, 6])
+        self.assertEqual(len(batch['positions']['fen']), 47 + 7)
+        self.assertEqual(batch['positions']['game'][47], 1)
+        self.assertEqual(batch['positions']['fen'][47], '8/P6k/8/8/8/8/6pK/8 w - - 0 1')
+        self.assertEqual(batch['positions']['move'][:2], ['e4', 'c5'])
+
+        batch = replay_chunk(PGN, trust=True, with_positions=False)
+        self.assertEqual(batch['positions']['fen'], [])
+        self.assertEqual(len(batch['games']['moves']), 2)
+
+    def test_ingest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.pgn')
+            with open(path, 'w') as file:
+                file.write(PGN + '\n' + BAD_GAME + '\n' + PGN)
+            out = os.path.join(directory, 'out')
+            stats = ingest(path, out, workers=2, games_per_batch=2)
+            self.assertEqual(stats, (4, 2 * (47 + 7), 1, 3))
+            self.assertEqual(sorted(os.listdir(out)), ['batch-000000.json.gz', 'batch-000001.json.gz',
+                                                       'batch-000002.json.gz'])
+            batch = read_batch(os.path.join(out, 'batch-000001.json.gz'))
+            self.assertEqual(batch['games']['headers'][0]['White'], 'Tiviakov, Sergei')
+            self.assertEqual(len(batch['errors']), 1)
+
+            self.assertEqual(main([path, out, '--workers', '1', '--trust', '--no-positions']), 0)
@@ -53,6 +53,29 @@ class TestMove(TestCase):
         self.assertRaises(InvalidNotationError, lambda: Move(self.board, Color.WHITE, Square('d6'), Square('e6')))
         self.assertRaises(InvalidNotationError, lambda: Move(self.board, Color.BLACK, Square('b6'), Square('b5')))
 
+    def test_not_in_check_restores_board(self):
+        before = repr(self.board)
+        Move(self.board, Color.WHITE, Square('e2'), Square('e4'))
+        self.assertEqual(repr(self.board), before)
+        self.assertEqual(self.board.occupancy, Board().occupancy)
+
+    def test_en_passant_discovered_check(self):
+        self.board.set_board_state([
+            '....K...',
+            '........',
+            '........',
+            'k.Pp...R',
+            '........',
+            '........',
+            '........',
+            '........'
+        ])
+        self.assertRaises(InvalidNotationError,
+                          lambda: Move(self.board, Color.WHITE, Square('d5'), Square('c6'), en_passant=True))
+        self.assertEqual(self.board.get_square('c5').piece, Piece(PieceType.PAWN, Color.BLACK))
+        self.assertEqual(self.board.get_square('d5').piece, Piece(PieceType.PAWN, Color.WHITE))
+        self.assertEqual(self.board.get_square('c6').piece, None)
+
     def test_castle(self):
         self.board.set_board_state([
             'R...K.NR',
@@ -78,6 +101,12 @@ class TestMove(TestCase):
         self.assertEqual(self.board.get_square(location='c8').piece, Piece(PieceType.KING, Color.BLACK))
         self.assertEqual(self.board.get_square(location='d8').piece, Piece(PieceType.ROOK, Color.BLACK))
 
+        c3.undo()
+        self.assertEqual(self.board.get_square(location='e8').piece, Piece(PieceType.KING, Color.BLACK))
+        self.assertEqual(self.board.get_square(location='a8').piece, Piece(PieceType.ROOK, Color.BLACK))
+        self.assertEqual(self.board.get_square(location='c8').piece, None)
+        self.assertEqual(self.board.get_square(location='d8').piece, None)
+
 
 """
 class TestMove(TestCase):
@@ -0,0 +1,185 @@
+from unittest import TestCase
+from metaknight.board import Board
+from metaknight.game import Game
+from metaknight.perft import REFERENCE_POSITIONS
+from metaknight.square import Square
+from metaknight.piece import Color, PieceType
+from metaknight.movegen import legal_moves, pinned_pieces, generate_moves, has_legal_move, new_move_buffer, encode, \
+    decode, NORMAL, EN_PASSANT, KING_SIDE_CASTLE, QUEEN_SIDE_CASTLE, CAPTURES, QUIETS
+
+
+def index(location: str) -> int:
+    return Square(location).index
+
+
+class MoveGenTests(TestCase):
+    def setUp(self):
+        self.board = Board()
+
+    def destinations(self, location: str, moves) -> set:
+        return {destination for origin, destination, promotion, flag in moves if origin == index(location)}
+
+    def test_initial_position(self):
+        self.assertEqual(len(legal_moves(self.board, Color.WHITE)), 20)
+        self.assertEqual(len(legal_moves(self.board, Color.BLACK)), 20)
+
+    def test_pins(self):
+        self.board.set_board_state([
+            '....K...',
+            '....R...',
+            '........',
+            '.b......',
+            '........',
+            '...n....',
+            '....r...',
+            '....k...',
+        ])
+        self.assertEqual(pinned_pieces(self.board, Color.WHITE), {
+            index('e2'): sum(1 << index(s) for s in ('e2', 'e3', 'e4', 'e5', 'e6', 'e7'))
+        })
+        self.assertEqual(list(pinned_pieces(self.board, Color.BLACK)), [index('e7')])
+        moves = legal_moves(self.board, Color.WHITE)
+        self.assertEqual(self.destinations('e2', moves), {index(s) for s in ('e3', 'e4', 'e5', 'e6', 'e7')})
+        self.assertEqual(self.destinations('d3', moves), {index(s) for s in ('b2', 'b4', 'c1', 'c5', 'e5', 'f2',
+                                                                              'f4')})
+
+    def test_single_check(self):
+        self.board.set_board_state([
+            '....K...',
+            '........',
+            '........',
+            '........',
+            '.B......',
+            '........',
+            'n.......',
+            '....k..r',
+        ])
+        moves = legal_moves(self.board, Color.WHITE, king_side=True)
+        self.assertEqual(self.destinations('a2', moves), {index('b4'), index('c3')})
+        self.assertEqual(self.destinations('h1', moves), set())
+        self.assertEqual(self.destinations('e1', moves), {index(s) for s in ('d1', 'e2', 'f1', 'f2')})
+
+    def test_double_check(self):
+        self.board.set_board_state([
+            '....R..K',
+            '........',
+            '........',
+            '........',
+            '.B......',
+            '........',
+            '...r....',
+            '....k...',
+        ])
+        moves = legal_moves(self.board, Color.WHITE)
+        self.assertEqual({origin for origin, destination, promotion, flag in moves}, {index('e1')})
+
+    def test_en_passant(self):
+        self.board.set_board_state([
+            '....K...',
+            '........',
+            '........',
+            '...pP...',
+            '........',
+            '........',
+            '........',
+            '....k...',
+        ])
+        moves = legal_moves(self.board, Color.WHITE, en_passant_file='e')
+        self.assertIn((index('d5'), index('e6'), None, EN_PASSANT), moves)
+
+        # Capturing en passant would open the fifth rank to the rook
+        self.board.set_board_state([
+            '....K...',
+            '........',
+            '........',
+            'k..pP..R',
+            '........',
+            '........',
+            '........',
+            '........',
+        ])
+        moves = legal_moves(self.board, Color.WHITE, en_passant_file='e')
+        self.assertNotIn((index('d5'), index('e6'), None, EN_PASSANT), moves)
+
+    def test_promotions(self):
+        self.board.set_board_state([
+            '.R..K...',
+            'p.......',
+            '........',
+            '........',
+            '........',
+            '........',
+            '........',
+            '....k...',
+        ])
+        moves = [move for move in legal_moves(self.board, Color.WHITE) if move[0] == index('a7')]
+        self.assertEqual(len(moves), 8)
+        self.assertEqual({promotion for origin, destination, promotion, flag in moves},
+                         {PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT})
+
+    def test_castling(self):
+        self.board.set_board_state([
+            'R...K..R',
+            '........',
+            '........',
+            '........',
+            '........',
+            '........',
+            '......B.',
+            'r...k..r',
+        ])
+        moves = legal_moves(self.board, Color.WHITE, king_side=True, queen_side=True)
+        self.assertIn((index('e1'), index('c1'), None, QUEEN_SIDE_CASTLE), moves)
+        # The bishop on g2 attacks f1, so the king cannot pass through it
+        self.assertNotIn((index('e1'), index('g1'), None, KING_SIDE_CASTLE), moves)
+
+        moves = legal_moves(self.board, Color.BLACK, king_side=True, queen_side=False)
+        self.assertIn((index('e8'), index('g8'), None, KING_SIDE_CASTLE), moves)
+        self.assertNotIn((index('e8'), index('c8'), None, QUEEN_SIDE_CASTLE), moves)
+
+    def test_move_codes(self):
+        for move in [(index('e2'), index('e4'), None, NORMAL), (index('b7'), index('a8'), PieceType.KNIGHT, NORMAL),
+                     (index('g2'), index('g1'), PieceType.QUEEN, NORMAL), (index('d5'), index('e6'), None, EN_PASSANT),
+                     (index('e1'), index('g1'), None, KING_SIDE_CASTLE),
+                     (index('e8'), index('c8'), None, QUEEN_SIDE_CASTLE)]:
+            code = encode(*move)
+            self.assertLess(code, 1 << 16)
+            self.assertEqual(decode(code), move)
+
+        buffer = new_move_buffer()
+        self.assertEqual(generate_moves(self.board, Color.WHITE, buffer), 20)
+        self.assertEqual([decode(code) for code in buffer[:20]], legal_moves(self.board, Color.WHITE))
+
+    def test_has_legal_move(self):
+        for fen, expected in (('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1', False),  # stalemate
+                              ('6rk/6pp/8/8/8/8/8/K5R1 b - - 0 1', True),
+                              ('6k1/5ppp/8/8/8/8/8/K3R3 b - - 0 1', True),
+                              ('4R1k1/5ppp/8/8/8/8/8/K7 b - - 0 1', False),  # back rank mate
+                              ('4R1k1/5ppp/8/8/8/8/8/K3r3 b - - 0 1', True),  # the rook can capture
+                              ('k7/8/1K6/8/8/8/8/8 b - - 0 1', True),
+                              ('k7/P7/1K6/8/8/8/8/8 b - - 0 1', False),
+                              ('8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1', True)):  # only en passant
+            game = Game.from_fen(fen)
+            self.assertEqual(has_legal_move(game.board, game.to_move, game.en_passant_file()), expected, fen)
+
+        # Agrees with the full generation on every position of a few plies from the reference positions
+        buffer = new_move_buffer()
+        for position in REFERENCE_POSITIONS:
+            game = Game.from_fen(position.fen)
+            for line in game.iter_possible_games(2):
+                has_move = has_legal_move(game.board, game.to_move, game.en_passant_file())
+                self.assertEqual(has_move, game.generate_move_codes(buffer) > 0, line)
+
+    def test_stages(self):
+        buffer = new_move_buffer()
+        for position in REFERENCE_POSITIONS:
+            game = Game.from_fen(position.fen)
+            for line in game.iter_possible_games(1):
+                all_moves = set(buffer[:game.generate_move_codes(buffer)])
+                captures = set(buffer[:game.generate_move_codes(buffer, stage=CAPTURES)])
+                quiets = set(buffer[:game.generate_move_codes(buffer, stage=QUIETS)])
+                self.assertEqual(captures | quiets, all_moves, line)
+                self.assertFalse(captures & quiets, line)
+                occupied = game.board.occupancy[0] | game.board.occupancy[1]
+                for code in captures:
+                    self.assertTrue(code >> 12 in (1, 2, 3, 4, 5) or occupied & 1 << (code >> 6 & 0x3f), line)
@@ -0,0 +1,88 @@
+from unittest import TestCase
+from metaknight.game import Game, encode_move
+from metaknight.movegen import new_move_buffer
+from metaknight.ordering import MoveOrderer, mvv_lva, capture_score, is_quiet, order_moves, see
+from metaknight.piece import PieceType
+
+KIWIPETE = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+
+
+class OrderingTests(TestCase):
+    def setUp(self):
+        self.game = Game.from_fen(KIWIPETE)
+        self.orderer = MoveOrderer()
+
+    def code(self, san: str) -> int:
+        return encode_move(self.game.notation_parser(san))
+
+    def test_mvv_lva(self):
+        self.assertGreater(mvv_lva(PieceType.QUEEN, PieceType.QUEEN), mvv_lva(PieceType.ROOK, PieceType.PAWN))
+        self.assertGreater(mvv_lva(PieceType.KNIGHT, PieceType.PAWN), mvv_lva(PieceType.KNIGHT, PieceType.BISHOP))
+        self.assertGreater(mvv_lva(PieceType.PAWN, PieceType.KING), mvv_lva(None, PieceType.PAWN))
+        self.assertGreater(mvv_lva(None, PieceType.PAWN, PieceType.QUEEN), mvv_lva(PieceType.BISHOP, PieceType.PAWN))
+
+        board = self.game.board
+        self.assertEqual(capture_score(board, self.code('Qxf6')), mvv_lva(PieceType.KNIGHT, PieceType.QUEEN))
+        self.assertEqual(capture_score(board, self.code('dxe6')), mvv_lva(PieceType.PAWN, PieceType.PAWN))
+        self.assertTrue(is_quiet(board, self.code('O-O')))
+        self.assertTrue(is_quiet(board, self.code('Nb1')))
+        self.assertFalse(is_quiet(board, self.code('Bxa6')))
+
+        moves = order_moves(self.game.generate_moves())
+        self.assertEqual(len(moves), 48)
+        self.assertEqual(self.game.san(moves[0]), 'Bxa6')
+        self.assertTrue(all(move.piece_captured for move in moves[:8]))
+        self.assertFalse(any(move.piece_captured for move in moves[8:]))
+
+    def test_moves(self):
+        buffer = new_move_buffer()
+        legal = set(buffer[:self.game.generate_move_codes(buffer)])
+        moves = list(self.orderer.moves(self.game, 0))
+        self.assertEqual(set(moves), legal)
+        self.assertEqual(len(moves), len(legal))
+        self.assertEqual(moves[0], self.code('Bxa6'))
+        self.assertEqual({self.game.decode_move(code).piece_captured is not None for code in moves[:8]}, {True})
+
+        hash_move = self.code('a3')
+        moves = list(self.orderer.moves(self.game, 0, hash_move))
+        self.assertEqual(moves[0], hash_move)
+        self.assertEqual(moves.count(hash_move), 1)
+        self.assertEqual(set(moves), legal)
+        # A code that is not legal here is left out
+        self.assertEqual(set(self.orderer.moves(self.game, 0, self.code('a3') ^ 1 << 6)), legal)
+
+    def test_killers_and_history(self):
+        killer = self.code('Kd1')
+        self.orderer.record_cutoff(self.game, killer, 3, 4)
+        self.orderer.record_cutoff(self.game, self.code('Qxf6'), 3, 4)
+        self.assertEqual(self.orderer.killers[3], [killer, 0])
+        self.assertEqual(self.orderer.history[0][killer & 0xfff], 16)
+
+        self.assertEqual(list(self.orderer.moves(self.game, 3))[8], killer)
+
+        # History puts the move first among the quiet moves at any ply, if it is not a killer there
+        self.orderer.record_cutoff(self.game, self.code('Rb1'), 3, 2)
+        self.assertEqual(self.orderer.killers[3][:2], [self.code('Rb1'), killer])
+        self.assertEqual(list(self.orderer.moves(self.game, 5))[8:10], [killer, self.code('Rb1')])
+
+        self.orderer.new_search()
+        self.assertEqual(self.orderer.killers[3], [0, 0])
+        self.assertEqual(self.orderer.history[0][killer & 0xfff], 8)
+
+    def test_see(self):
+        board = self.game.board
+        self.assertEqual(see(board, self.code('Bxa6')), 330)
+        self.assertEqual(see(board, self.code('Qxf6')), 320 - 900)
+        self.assertEqual(see(board, self.code('Nxf7')), 100 - 320)
+        self.assertEqual(see(board, self.code('dxe6')), 0)
+
+        game = Game.from_fen('1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1')
+        self.assertEqual(see(game.board, encode_move(game.notation_parser('Rxe5'))), 100)
+        # The queens join in once the bishop on f6 and the rook on e2 in front of them have captured
+        game = Game.from_fen('1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1')
+        self.assertEqual(see(game.board, encode_move(game.notation_parser('Nxe5'))), 100 - 320)
+        # The king can't take the bishop back while the rook on d8 defends it
+        game = Game.from_fen('3rk3/8/8/8/1b6/8/R2q4/4K3 w - - 0 1')
+        self.assertEqual(see(game.board, encode_move(game.notation_parser('Rxd2'))), 900 - 500)
+        game = Game.from_fen('4k3/8/8/8/8/8/8/R2rK3 w - - 0 1')
+        self.assertEqual(see(game.board, encode_move(game.notation_parser('Kxd1'))), 500)
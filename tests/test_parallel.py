@@ -0,0 +1,102 @@
+from unittest import TestCase
+from metaknight.game import Game
+from metaknight.parallel import pack_game, unpack_game, find_move, parallel_perft, parallel_divide, \
+    parallel_possible_games, parallel_search, lazy_smp_search, skip_pattern
+from metaknight.perft import divide, load_position, move_name, REFERENCE_POSITIONS
+from metaknight.search import MATE, best_move
+from metaknight.square import Square
+import os
+import subprocess
+import sys
+
+
+class ParallelTests(TestCase):
+    def test_pack_game(self):
+        game = Game()
+        for notation in ('e4', 'Nf6', 'e5', 'd5'):
+            game.play_move(notation)
+        packed = pack_game(game)
+        self.assertEqual(packed, 'rnbqkb1r/ppp1pppp/5n2/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 3')
+        copy = unpack_game(packed)
+        self.assertEqual(repr(copy.board), repr(game.board))
+        self.assertEqual(copy.zobrist_key, game.zobrist_key)
+        self.assertIsNotNone(find_move(copy, 'e5d6'))
+        self.assertRaises(ValueError, lambda: find_move(copy, 'e5e4'))
+
+    def test_parallel_perft(self):
+        game = load_position(REFERENCE_POSITIONS[1])
+        self.assertEqual(parallel_divide(game, 2, workers=2), divide(game, 2))
+        self.assertEqual(parallel_perft(Game(), 3, workers=2), 8902)
+        self.assertEqual(parallel_perft(Game(), 1, workers=2), 20)
+
+    def test_depth_below_one(self):
+        for depth in (0, -3):
+            self.assertRaises(ValueError, lambda: parallel_divide(Game(), depth, workers=2))
+            self.assertRaises(ValueError, lambda: parallel_perft(Game(), depth, workers=2))
+            self.assertRaises(ValueError, lambda: parallel_search(Game(), depth, workers=2))
+
+    def test_parallel_possible_games(self):
+        lines = parallel_possible_games(Game(), 2, workers=2)
+        self.assertEqual(len(lines), 400)
+        self.assertEqual(lines[0], ['b1a3', 'a7a5'])
+        self.assertEqual(lines, parallel_possible_games(Game(), 2, workers=3))
+
+    def test_parallel_search(self):
+        game = Game()
+        game.board.set_board_state([
+            '......K.',
+            '.....PPP',
+            '........',
+            '........',
+            '........',
+            '........',
+            '........',
+            'r.....k.',
+        ])
+        result = parallel_search(game, 2, workers=2)
+        self.assertEqual(result.best_move.destination, Square('a8'))
+        self.assertEqual(result.score, MATE - 1)
+        self.assertEqual(len(game.game_history), 0)
+
+        # The root moves are scored with the quiescence search, as in the serial search: Qxd5 loses the queen to cxd5
+        game = Game.from_fen('k7/8/2p5/3p4/8/8/8/K2Q4 w - - 0 1')
+        result = parallel_search(game, 1, workers=2)
+        serial = best_move(game, max_depth=1)
+        self.assertNotEqual(result.best_move.destination, Square('d5'))
+        self.assertEqual(move_name(result.best_move), move_name(serial.best_move))
+        self.assertEqual(result.score, serial.score)
+
+    def test_lazy_smp_search(self):
+        game = Game()
+        game.play_move('e4')
+        game.play_move('d5')
+        result = lazy_smp_search(game, time_limit=0.5, workers=2, table_mb=1)
+        self.assertIsNotNone(result.best_move)
+        self.assertGreaterEqual(result.depth, 2)
+        self.assertEqual(result.pv[0], result.best_move)
+        self.assertEqual(len(game.game_history), 2)
+
+    def test_skip_pattern(self):
+        self.assertEqual(skip_pattern(0), (0, 0))
+        self.assertEqual([skip_pattern(worker) for worker in range(1, 8)],
+                         [(1, 0), (1, 1), (2, 0), (2, 1), (2, 2), (2, 3), (3, 0)])
+        # No two workers search the same depths
+        schedules = set()
+        for worker in range(64):
+            size, phase = skip_pattern(worker)
+            schedules.add(tuple(depth for depth in range(2, 40) if not size or not (depth + phase) // size % 2))
+        self.assertEqual(len(schedules), 64)
+
+    def test_lazy_smp_shared_memory(self):
+        # The resource tracker complains on stderr if the workers unregister the block the main process unlinks
+        for method in ('fork', 'spawn'):
+            script = 'import multiprocessing\n' \
+                     'from metaknight.game import Game\n' \
+                     'from metaknight.parallel import lazy_smp_search\n' \
+                     "if __name__ == '__main__':\n" \
+                     f'    multiprocessing.set_start_method({method!r})\n' \
+                     '    lazy_smp_search(Game(), time_limit=0.2, workers=2, table_mb=1)\n'
+            process = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                                     cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            self.assertEqual(process.returncode, 0, process.stderr)
+            self.assertEqual(process.stderr, '', method)
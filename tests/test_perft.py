@@ -0,0 +1,47 @@
+from unittest import TestCase
+from io import StringIO
+from contextlib import redirect_stderr
+from metaknight.game import Game
+from metaknight.perft import perft, divide, timed_perft, run_suite, load_position, main, REFERENCE_POSITIONS
+from metaknight.piece import Color
+
+
+class PerftTests(TestCase):
+    def test_initial_position(self):
+        game = Game()
+        self.assertEqual(perft(game, 0), 1)
+        self.assertEqual(perft(game, 1), 20)
+        self.assertEqual(perft(game, 3), 8902)
+        self.assertEqual(repr(game.board), repr(Game().board))
+
+    def test_divide(self):
+        counts = divide(Game(), 2)
+        self.assertEqual(len(counts), 20)
+        self.assertEqual(counts['e2e4'], 20)
+        self.assertEqual(sum(counts.values()), 400)
+        self.assertEqual(len(divide(Game(), 1)), 20)
+        self.assertRaises(ValueError, lambda: divide(Game(), 0))
+
+    def test_timed_perft(self):
+        result = timed_perft(Game(), 2, phases=True)
+        self.assertEqual(result.nodes, 400)
+        self.assertGreater(result.nodes_per_second, 0)
+        self.assertLessEqual(result.generation_time + result.make_unmake_time, result.time)
+
+    def test_load_position(self):
+        game = load_position(REFERENCE_POSITIONS[3])
+        self.assertEqual(game.castling_rights(), [[False, False], [True, True]])
+        self.assertEqual(game.to_move, Color.WHITE)
+
+    def test_suite(self):
+        out = StringIO()
+        self.assertTrue(run_suite(max_nodes=10000, out=out))
+        self.assertNotIn('FAILED', out.getvalue())
+
+    def test_main(self):
+        self.assertEqual(main(['2', '--position', 'kiwipete']), 0)
+        with redirect_stderr(StringIO()):
+            for depth in ('0', '-1'):
+                with self.assertRaises(SystemExit) as context:
+                    main([depth])
+                self.assertEqual(context.exception.code, 2)
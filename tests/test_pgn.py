@@ -0,0 +1,81 @@
+from unittest import TestCase
+from metaknight.pgn import read_games, replay, positions, play_san, PgnGame
+from metaknight.game import Game
+from metaknight.move import InvalidNotationError
+from metaknight.piece import Piece, PieceType, Color
+from io import StringIO
+import gzip
+import os
+import tempfile
+
+PGN = '''[Event "Tata Steel"]
+[White "Tiviakov, Sergei"]
+[Black "Anand, Viswanathan"]
+[Result "1/2-1/2"]
+
+1. e4 c5 2. Nf3 d6 3. Bb5+ Nd7 {A quiet line} 4. d4 cxd4 5. Qxd4 a6 6. Bxd7+ Bxd7
+7. c4 e5 8. Qd3 h6 (8... Nf6 9. Nc3 $1) 9. Nc3 Nf6 10. O-O Be7 11. a4 b6 12. b3 Ra7
+13. Rd1 Bc8 14. Ba3 Rd7 15. Nd2 O-O 16. Nf1 Bb7 17. Ne3 Re8 18. Ncd5 Nxd5 ; a comment
+19. Nxd5 Bxd5 20. Qxd5 Qa8 21. Qxa8 Rxa8 22. Rd5 f6 23. Rad1 Rad8 1/2-1/2
+
+[Event "Promotion"]
+[SetUp "1"]
+[FEN "8/P6k/8/8/8/8/6pK/8 w - - 0 1"]
+
+1. a8=Q g1=N+ 2. Kh1 Nf3 3. Qb7+ Kg6 *
+'''
+
+
+class PgnTests(TestCase):
+    def test_read_games(self):
+        first, second = read_games(StringIO(PGN))
+        self.assertEqual(first.headers['White'], 'Tiviakov, Sergei')
+        self.assertEqual(first.result, '1/2-1/2')
+        self.assertEqual(len(first.moves), 46)
+        self.assertEqual(first.moves[:5], ['e4', 'c5', 'Nf3', 'd6', 'Bb5+'])
+        self.assertEqual(first.moves[15:18], ['h6', 'Nc3', 'Nf6'])
+        self.assertEqual(second.result, '*')
+        self.assertEqual(second.moves, ['a8=Q', 'g1=N+', 'Kh1', 'Nf3', 'Qb7+', 'Kg6'])
+
+    def test_no_result(self):
+        games = list(read_games(StringIO('[Result "1-0"]\n\n1. e4 e5\n\n[Result "0-1"]\n1. d4')))
+        self.assertEqual([game.result for game in games], ['1-0', '0-1'])
+        self.assertEqual(games[1].moves, ['d4'])
+
+    def test_replay(self):
+        for trust in (False, True):
+            first, second = read_games(StringIO(PGN))
+            game = replay(first, trust)
+            self.assertEqual(game.to_fen(), '3r2k1/3rb1p1/pp1p1p1p/3Rp3/P1P1P3/BP6/5PPP/3R2K1 w - - 2 24')
+            game = replay(second, trust)
+            self.assertEqual(game.board.get_square('b7').piece, Piece(PieceType.QUEEN, Color.WHITE))
+            self.assertEqual(game.board.get_square('f3').piece, Piece(PieceType.KNIGHT, Color.BLACK))
+
+    def test_trust(self):
+        game = Game.from_fen('4k3/8/8/8/8/8/3N1N2/4K3 w - - 0 1')
+        play_san(game, 'Nfe4', trust=True)
+        self.assertEqual(game.board.get_square('f2').piece, None)
+        self.assertEqual(game.board.get_square('e4').piece, Piece(PieceType.KNIGHT, Color.WHITE))
+
+        # The knight on d2 is pinned, so Ne4 can only be the knight on f2
+        game = Game.from_fen('4k3/8/8/b7/8/8/3N1N2/4K3 w - - 0 1')
+        play_san(game, 'Ne4', trust=True)
+        self.assertEqual(game.board.get_square('f2').piece, None)
+        self.assertRaises(InvalidNotationError, lambda: play_san(game, 'Qd5', trust=True))
+
+        game = Game.from_fen('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1')
+        play_san(game, 'exd6', trust=True)
+        self.assertEqual(game.board.get_square('d5').piece, None)
+
+    def test_positions(self):
+        records = list(positions(PgnGame({}, ['e4', 'e5'], '*')))
+        self.assertEqual([record.ply for record in records], [0, 1, 2])
+        self.assertEqual(records[1].fen, 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1')
+        self.assertEqual([record.move for record in records], ['e4', 'e5', ''])
+
+    def test_gzip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.pgn.gz')
+            with gzip.open(path, 'wt', encoding='utf-8') as file:
+                file.write(PGN)
+            self.assertEqual([game.result for game in read_games(path)], ['1/2-1/2', '*'])
@@ -0,0 +1,80 @@
+from unittest import TestCase
+from metaknight.game import Game
+from metaknight.search import Search, best_move, MATE
+from metaknight.piece import Color
+from metaknight.square import Square
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.game = Game()
+
+    def test_mate_in_one(self):
+        self.game.board.set_board_state([
+            '......K.',
+            '.....PPP',
+            '........',
+            '........',
+            '........',
+            '........',
+            '........',
+            'r.....k.',
+        ])
+        result = best_move(self.game, max_depth=3)
+        self.assertEqual(result.best_move.destination, Square('a8'))
+        self.assertEqual(result.score, MATE - 1)
+        self.assertEqual(len(result.pv), 1)
+
+    def test_wins_material(self):
+        self.game.play_move('e4')
+        self.game.play_move('d5')
+        self.game.play_move('Nc3')
+        self.game.play_move('Qd6')
+        self.game.play_move('a3')
+        self.game.play_move('Qb4')
+        result = best_move(self.game, max_depth=2)
+        self.assertEqual(result.best_move.destination, Square('b4'))
+        self.assertEqual(result.depth, 2)
+
+    def test_game_is_restored(self):
+        self.game.play_move('e4')
+        before = repr(self.game.board)
+        key = self.game.zobrist_key
+        Search(self.game, node_limit=500).search(4)
+        self.assertEqual(repr(self.game.board), before)
+        self.assertEqual(self.game.zobrist_key, key)
+        self.assertEqual(self.game.to_move, Color.BLACK)
+        self.assertEqual(len(self.game.game_history), 1)
+
+    def test_limits(self):
+        result = Search(self.game, node_limit=200).search()
+        self.assertIsNotNone(result.best_move)
+        self.assertLess(result.nodes, 1000)
+
+        result = Search(self.game, time_limit=0.2).search()
+        self.assertIsNotNone(result.best_move)
+        self.assertLess(result.time, 2)
+
+    def test_principal_variation(self):
+        result = best_move(self.game, max_depth=3)
+        self.assertEqual(result.pv[0], result.best_move)
+        for move in result.pv:
+            self.game.play_move(m=move)
+        self.assertEqual(len(self.game.game_history), len(result.pv))
+
+    def test_quiescence(self):
+        # Taking the pawn on d5 loses the queen to cxd5, which only the quiescence search sees at depth 1
+        game = Game.from_fen('k7/8/2p5/3p4/8/8/8/K2Q4 w - - 0 1')
+        result = best_move(game, max_depth=1)
+        self.assertNotEqual(result.best_move.destination, Square('d5'))
+        self.assertGreater(result.score, 500)
+        self.assertEqual(game.to_fen(), 'k7/8/2p5/3p4/8/8/8/K2Q4 w - - 0 1')
+
+    def test_skip_depths(self):
+        self.game.play_move('e4')
+        full = Search(self.game).search(4)
+        skipping = Search(self.game).search(4, skip_size=1)
+        # Depth 3 is skipped, but the first and the last depth never are
+        self.assertEqual(skipping.depth, 4)
+        self.assertLess(skipping.nodes, full.nodes)
+        self.assertEqual(Search(self.game).search(1, skip_size=1, skip_phase=1).depth, 1)
@@ -1,5 +1,7 @@
 from unittest import TestCase
-from metaknight.square import Square
+from metaknight.square import Square, OFF_BOARD
+from copy import deepcopy
+import pickle
 
 
 class SquareTests(TestCase):
@@ -49,3 +51,18 @@ class SquareTests(TestCase):
         self.assertEqual(Square('c8').left(), Square('b8'))
         self.assertEqual(Square('b8').left(), Square('a8'))
         self.assertEqual(self.square.left(), Square('00'))
+
+    def test_interning(self):
+        self.assertIs(Square('e4'), Square('e4'))
+        self.assertIs(Square('00'), OFF_BOARD)
+        self.assertIs(Square('e4').up(), Square('e5'))
+        self.assertIs(deepcopy(Square('e4')), Square('e4'))
+        self.assertIs(pickle.loads(pickle.dumps(Square('e4'))), Square('e4'))
+        self.assertEqual({Square('e4'): 1}[Square('e4')], 1)
+
+        # A square of a board is its own object, but equal to the interned one
+        unique = Square.unique('e4')
+        self.assertIsNot(unique, Square('e4'))
+        self.assertEqual(unique, Square('e4'))
+        self.assertEqual(hash(unique), hash(Square('e4')))
+        self.assertFalse(hasattr(unique, '__dict__'))
@@ -0,0 +1,86 @@
+from unittest import TestCase
+from metaknight.transposition import TranspositionTable, Entry, EXACT, LOWER_BOUND, UPPER_BOUND, \
+    DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER
+
+
+class TranspositionTableTests(TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(size_mb=1)
+
+    def colliding_keys(self, table: TranspositionTable, n: int) -> list:
+        # Keys that map to the same bucket
+        return [(i << 40) | (i << 20) | 5 for i in range(1, n + 1)]
+
+    def test_size(self):
+        self.assertEqual(len(self.table) * 16, 1024 * 1024)
+        self.assertEqual(len(TranspositionTable(size_mb=3)) * 16, 2 * 1024 * 1024)
+        self.assertRaises(ValueError, lambda: TranspositionTable(replacement='random'))
+
+    def test_store_and_probe(self):
+        key = 0x1234567890abcdef
+        self.assertIsNone(self.table.probe(key))
+        self.table.store(key, depth=5, bound=EXACT, score=-250, move=1234)
+        self.assertEqual(self.table.probe(key), Entry(5, EXACT, -250, 1234))
+        self.assertIsNone(self.table.probe(key ^ (1 << 63)))
+
+        # A result without a move keeps the move that was stored for the position
+        self.table.store(key, depth=6, bound=LOWER_BOUND, score=100)
+        self.assertEqual(self.table.probe(key), Entry(6, LOWER_BOUND, 100, 1234))
+
+    def test_torn_entry(self):
+        key = 0xfedcba0987654321
+        self.table.store(key, depth=3, bound=UPPER_BOUND, score=42, move=7)
+        slot = [i for i in range(len(self.table)) if self.table.data[i]][0]
+        self.table.data[slot] ^= 1 << 40  # The data was overwritten without its key
+        self.assertIsNone(self.table.probe(key))
+
+    def test_depth_preferred(self):
+        table = TranspositionTable(size_mb=1, replacement=DEPTH_PREFERRED)
+        a, b, c = self.colliding_keys(table, 3)
+        table.store(a, depth=8, bound=EXACT, score=1)
+        table.store(b, depth=4, bound=EXACT, score=2)
+        table.store(c, depth=2, bound=EXACT, score=3)
+        self.assertIsNotNone(table.probe(a))
+        self.assertIsNotNone(table.probe(b))
+        self.assertIsNone(table.probe(c))
+
+        table.store(a, depth=3, bound=EXACT, score=4)
+        self.assertEqual(table.probe(a).depth, 8)
+
+        # Results from an older search give way to new ones
+        table.new_search()
+        table.store(c, depth=2, bound=EXACT, score=3)
+        self.assertIsNotNone(table.probe(c))
+        self.assertIsNotNone(table.probe(a))
+
+    def test_always_replace(self):
+        table = TranspositionTable(size_mb=1, replacement=ALWAYS_REPLACE)
+        keys = self.colliding_keys(table, 3)
+        for key in keys:
+            table.store(key, depth=10, bound=EXACT, score=0)
+        self.assertIsNotNone(table.probe(keys[-1]))
+        table.store(keys[-1], depth=1, bound=EXACT, score=5)
+        self.assertEqual(table.probe(keys[-1]), Entry(1, EXACT, 5, 0))
+
+    def test_two_tier(self):
+        table = TranspositionTable(size_mb=1, replacement=TWO_TIER)
+        a, b, c = self.colliding_keys(table, 3)
+        table.store(a, depth=8, bound=EXACT, score=1)
+        table.store(b, depth=2, bound=EXACT, score=2)
+        table.store(c, depth=1, bound=EXACT, score=3)
+        self.assertIsNotNone(table.probe(a))
+        self.assertIsNone(table.probe(b))
+        self.assertIsNotNone(table.probe(c))
+
+    def test_shared_buffer(self):
+        buffer = bytearray(TranspositionTable.bytes_needed(1))
+        first = TranspositionTable(size_mb=1, buffer=buffer)
+        second = TranspositionTable(size_mb=1, buffer=buffer)
+        first.store(12345, depth=4, bound=LOWER_BOUND, score=-7, move=99)
+        self.assertEqual(second.probe(12345), Entry(4, LOWER_BOUND, -7, 99))
+        first.close()
+        second.close()
+        buffer.extend(b'\0')  # the buffer can be resized once no table uses it
+
+        with self.assertRaises(ValueError):
+            TranspositionTable(size_mb=1, buffer=bytearray(100))